@@ -11,7 +11,7 @@ import mido
 def midifile_to_dict(mid):
     tracks = []
     for track in mid.tracks:
-        tracks.append([vars(msg).copy() for msg in track])
+        tracks.append([msg.dict() for msg in track])
 
     return {
         'ticks_per_beat': mid.ticks_per_beat,
@@ -3,19 +3,22 @@
 # SPDX-License-Identifier: MIT
 
 from .messages import Message
+from .messages.messages import _from_msgdict
 from .midifiles import MetaMessage, UnknownMetaMessage
 
 
 class Frozen:
+    __slots__ = ()
+
     def __setattr__(self, *_):
         raise ValueError('frozen message is immutable')
 
     def __hash__(self):
-        return hash(tuple(sorted(vars(self).items())))
+        return hash(tuple(sorted(self._msgdict().items())))
 
 
 class FrozenMessage(Frozen, Message):
-    pass
+    __slots__ = ()
 
 
 class FrozenMetaMessage(Frozen, MetaMessage):
@@ -60,6 +63,9 @@ def freeze_message(msg):
     else:
         raise ValueError('first argument must be a message or None')
 
+    if class_ is FrozenMessage:
+        return _from_msgdict(class_, msg._msgdict())
+
     frozen = class_.__new__(class_)
     vars(frozen).update(vars(msg))
     return frozen
@@ -86,6 +92,9 @@ def thaw_message(msg):
     else:
         raise ValueError('first argument must be a message or None')
 
+    if class_ is Message:
+        return _from_msgdict(class_, msg._msgdict())
+
     thawed = class_.__new__(class_)
     vars(thawed).update(vars(msg))
     return thawed
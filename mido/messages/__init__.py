@@ -10,6 +10,7 @@ from .messages import (
     parse_string,
     parse_string_stream,
 )
+from .packed import PackedMessage
 from .specs import (
     MAX_PITCHWHEEL,
     MAX_SONGPOS,
@@ -27,6 +28,7 @@ __all__ = [
     "MIN_PITCHWHEEL",
     "MIN_SONGPOS",
     "Message",
+    "PackedMessage",
     "SPEC_BY_STATUS",
     "SPEC_BY_TYPE",
     "SPEC_LOOKUP",
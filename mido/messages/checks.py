@@ -105,3 +105,86 @@ def check_msgdict(msgdict):
                 '{} message has no attribute {}'.format(spec.type, name))
 
         check_value(name, value)
+
+
+# Valid range of each integer attribute. The validators below use
+# these for a quick check of plain ints. Anything else goes through
+# the regular checks above.
+_INT_RANGES = {
+    'channel': (0, 15),
+    'control': (0, 127),
+    'frame_type': (0, 7),
+    'frame_value': (0, 15),
+    'note': (0, 127),
+    'pitch': (MIN_PITCHWHEEL, MAX_PITCHWHEEL),
+    'pos': (MIN_SONGPOS, MAX_SONGPOS),
+    'program': (0, 127),
+    'song': (0, 127),
+    'value': (0, 127),
+    'velocity': (0, 127),
+}
+
+
+def _make_value_check(name):
+    check = _CHECKS[name]
+    if name not in _INT_RANGES:
+        return check
+
+    low, high = _INT_RANGES[name]
+
+    def check_int(value):
+        if value.__class__ is not int or not low <= value <= high:
+            check(value)
+
+    return check_int
+
+
+# Like _CHECKS but with a fast path for plain ints.
+_VALUE_CHECKS = {name: _make_value_check(name) for name in _CHECKS}
+
+
+def make_value_check(name):
+    """Return a function that checks values of the attribute name.
+
+    This does the same as check_value(name, value), but plain ints in
+    range are accepted without calling the regular checks.
+    """
+    return _VALUE_CHECKS[name]
+
+
+def make_msgdict_check(type_):
+    """Return a function that checks message dictionaries of type_.
+
+    The function does the same as check_msgdict() but is specialized
+    for the type. When all attributes are plain ints (or floats for
+    time) in range it returns without calling the regular checks. If
+    not, it hands the dictionary to check_msgdict(), so you get the
+    same errors as before, and values that are only accepted through
+    the Integral and Real ABCs are still accepted.
+    """
+    spec = SPEC_BY_TYPE[type_]
+    ranges = tuple((name, *_INT_RANGES[name])
+                   for name in spec.value_names if name != 'data')
+    size = len(spec.attribute_names)
+    has_data = 'data' in spec.value_names
+
+    def check(msgdict):
+        if len(msgdict) == size:
+            for name, low, high in ranges:
+                value = msgdict.get(name)
+                if value.__class__ is not int or not low <= value <= high:
+                    break
+            else:
+                time = msgdict.get('time')
+                if time.__class__ is int or time.__class__ is float:
+                    if not has_data:
+                        return
+                    elif 'data' in msgdict:
+                        # Time is valid so this is the only check
+                        # that can fail.
+                        check_data(msgdict['data'])
+                        return
+
+        check_msgdict(msgdict)
+
+    return check
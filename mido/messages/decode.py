@@ -112,3 +112,123 @@ def decode_message(msg_bytes, time=0, check=True):
         msg.update(_decode_data_bytes(status_byte, data, spec))
 
     return msg
+
+
+def _is_data_byte(value):
+    return value.__class__ is int and 0 <= value <= 127
+
+
+def _make_decoder(status_byte, type_class):
+    """Return a decoder for messages with the given status byte.
+
+    The decoder takes (msg_bytes, time) and builds a message of
+    type_class directly, without going through a dictionary. This is
+    the same as decode_message() followed by setting the attributes,
+    only faster.
+
+    The decoder returns None if msg_bytes is anything other than a
+    valid message of this kind (including data bytes that are not
+    plain ints). The caller can then fall back to decode_message(),
+    which will return the same message or raise the same error as
+    before. Sysex has no decoder since its data needs to be copied
+    anyway.
+    """
+    spec = SPEC_BY_STATUS[status_byte]
+    if spec.type == 'sysex':
+        return None
+
+    new = object.__new__
+    setters = [set_value for _, set_value in type_class._setters]
+    set_time = setters.pop()
+    channel = status_byte & 0x0f
+
+    if spec.length == 1:
+        def decode(msg_bytes, time):
+            if len(msg_bytes) == 1:
+                msg = new(type_class)
+                set_time(msg, time)
+                return msg
+
+    elif spec.type == 'pitchwheel':
+        set_channel, set_pitch = setters
+
+        def decode(msg_bytes, time):
+            if len(msg_bytes) == 3:
+                lsb = msg_bytes[1]
+                msb = msg_bytes[2]
+                if (lsb.__class__ is int and 0 <= lsb <= 127
+                        and msb.__class__ is int and 0 <= msb <= 127):
+                    msg = new(type_class)
+                    set_channel(msg, channel)
+                    set_pitch(msg, lsb | ((msb << 7) + MIN_PITCHWHEEL))
+                    set_time(msg, time)
+                    return msg
+
+    elif status_byte in CHANNEL_MESSAGES and spec.length == 3:
+        set_channel, set_data1, set_data2 = setters
+
+        def decode(msg_bytes, time):
+            if len(msg_bytes) == 3:
+                data1 = msg_bytes[1]
+                data2 = msg_bytes[2]
+                if (data1.__class__ is int and 0 <= data1 <= 127
+                        and data2.__class__ is int and 0 <= data2 <= 127):
+                    msg = new(type_class)
+                    set_channel(msg, channel)
+                    set_data1(msg, data1)
+                    set_data2(msg, data2)
+                    set_time(msg, time)
+                    return msg
+
+    elif status_byte in CHANNEL_MESSAGES:
+        set_channel, set_data1 = setters
+
+        def decode(msg_bytes, time):
+            if len(msg_bytes) == 2:
+                data1 = msg_bytes[1]
+                if data1.__class__ is int and 0 <= data1 <= 127:
+                    msg = new(type_class)
+                    set_channel(msg, channel)
+                    set_data1(msg, data1)
+                    set_time(msg, time)
+                    return msg
+
+    else:
+        # System common messages are rare enough to go through the
+        # dictionary returned by the special case decoders.
+        if status_byte in _SPECIAL_CASES:
+            decode_data = _SPECIAL_CASES[status_byte]
+        else:
+            def decode_data(data):
+                return _decode_data_bytes(status_byte, data, spec)
+
+        names = [name for name, _ in type_class._setters[:-1]]
+
+        def decode(msg_bytes, time):
+            data = msg_bytes[1:]
+            if (len(data) == spec.length - 1
+                    and all(_is_data_byte(byte) for byte in data)):
+                args = decode_data(data)
+                msg = new(type_class)
+                for name, set_value in zip(names, setters):
+                    set_value(msg, args[name])
+                set_time(msg, time)
+                return msg
+
+    return decode
+
+
+def make_decoders(type_class):
+    """Return a table of decoders by status byte.
+
+    type_class(type) must return the class to create messages of the
+    given type with. See _make_decoder().
+    """
+    decoders = {}
+    for status_byte in range(256):
+        spec = SPEC_BY_STATUS.get(status_byte)
+        if spec is not None:
+            decoder = _make_decoder(status_byte, type_class(spec.type))
+            if decoder is not None:
+                decoders[status_byte] = decoder
+    return decoders
@@ -0,0 +1,205 @@
+# SPDX-FileCopyrightText: 2026 Mido project
+#
+# SPDX-License-Identifier: MIT
+
+"""Functions that create messages of a given type.
+
+These do the same as Message(), for example::
+
+    note_on(0, 60, 64, time=10)
+
+is the same as::
+
+    Message('note_on', channel=0, note=60, velocity=64, time=10)
+
+but the attributes are passed in a fixed order, so there is no
+dictionary of default values to fill in. The values are checked
+inline and the message is created directly, which makes this several
+times faster. Use these when you create a lot of messages.
+
+The attributes are passed in the same order as they are listed in the
+message specification. There are no functions for the realtime
+messages, which have no attributes besides time.
+"""
+from .checks import (
+    check_channel,
+    check_data,
+    check_data_byte,
+    check_frame_type,
+    check_frame_value,
+    check_pitch,
+    check_pos,
+    check_time,
+)
+from .messages import Message, SysexData, _type_class
+from .specs import MAX_PITCHWHEEL, MAX_SONGPOS, MIN_PITCHWHEEL, MIN_SONGPOS
+
+
+def _slots(type_):
+    # Return the message class for type_ followed by the slot setters
+    # for its attributes (with time last).
+    type_class = _type_class(Message, type_)
+    return (type_class, *[set_value for _, set_value in type_class._setters])
+
+
+_NOTE_OFF = _slots('note_off')
+_NOTE_ON = _slots('note_on')
+_POLYTOUCH = _slots('polytouch')
+_CONTROL_CHANGE = _slots('control_change')
+_PROGRAM_CHANGE = _slots('program_change')
+_AFTERTOUCH = _slots('aftertouch')
+_PITCHWHEEL = _slots('pitchwheel')
+_SYSEX = _slots('sysex')
+_QUARTER_FRAME = _slots('quarter_frame')
+_SONGPOS = _slots('songpos')
+_SONG_SELECT = _slots('song_select')
+
+
+# The checks below accept plain ints in range right away and leave
+# everything else to the regular checks, which raise the usual errors
+# or accept other Integral and Real values.
+
+def _check_time(time):
+    if time.__class__ is not int and time.__class__ is not float:
+        check_time(time)
+
+
+def _channel_message(slots, channel, data1, data2, time):
+    # Create a message with channel and two data bytes.
+    if channel.__class__ is not int or not 0 <= channel <= 15:
+        check_channel(channel)
+    if data1.__class__ is not int or not 0 <= data1 <= 127:
+        check_data_byte(data1)
+    if data2.__class__ is not int or not 0 <= data2 <= 127:
+        check_data_byte(data2)
+    _check_time(time)
+
+    type_class, set_channel, set_data1, set_data2, set_time = slots
+    msg = object.__new__(type_class)
+    set_channel(msg, channel)
+    set_data1(msg, data1)
+    set_data2(msg, data2)
+    set_time(msg, time)
+    return msg
+
+
+def _short_channel_message(slots, channel, data1, time):
+    # Create a message with channel and one data byte.
+    if channel.__class__ is not int or not 0 <= channel <= 15:
+        check_channel(channel)
+    if data1.__class__ is not int or not 0 <= data1 <= 127:
+        check_data_byte(data1)
+    _check_time(time)
+
+    type_class, set_channel, set_data1, set_time = slots
+    msg = object.__new__(type_class)
+    set_channel(msg, channel)
+    set_data1(msg, data1)
+    set_time(msg, time)
+    return msg
+
+
+def note_off(channel, note, velocity, time=0):
+    """Create a note_off message."""
+    return _channel_message(_NOTE_OFF, channel, note, velocity, time)
+
+
+def note_on(channel, note, velocity, time=0):
+    """Create a note_on message."""
+    return _channel_message(_NOTE_ON, channel, note, velocity, time)
+
+
+def polytouch(channel, note, value, time=0):
+    """Create a polytouch message."""
+    return _channel_message(_POLYTOUCH, channel, note, value, time)
+
+
+def control_change(channel, control, value, time=0):
+    """Create a control_change message."""
+    return _channel_message(_CONTROL_CHANGE, channel, control, value, time)
+
+
+def program_change(channel, program, time=0):
+    """Create a program_change message."""
+    return _short_channel_message(_PROGRAM_CHANGE, channel, program, time)
+
+
+def aftertouch(channel, value, time=0):
+    """Create an aftertouch message."""
+    return _short_channel_message(_AFTERTOUCH, channel, value, time)
+
+
+def pitchwheel(channel, pitch, time=0):
+    """Create a pitchwheel message."""
+    if channel.__class__ is not int or not 0 <= channel <= 15:
+        check_channel(channel)
+    if (pitch.__class__ is not int
+            or not MIN_PITCHWHEEL <= pitch <= MAX_PITCHWHEEL):
+        check_pitch(pitch)
+    _check_time(time)
+
+    type_class, set_channel, set_pitch, set_time = _PITCHWHEEL
+    msg = object.__new__(type_class)
+    set_channel(msg, channel)
+    set_pitch(msg, pitch)
+    set_time(msg, time)
+    return msg
+
+
+def sysex(data, time=0):
+    """Create a sysex message.
+
+    data is an iterable of data bytes, without the start and end
+    bytes.
+    """
+    data = SysexData(data)
+    check_data(data)
+    _check_time(time)
+
+    type_class, set_data, set_time = _SYSEX
+    msg = object.__new__(type_class)
+    set_data(msg, data)
+    set_time(msg, time)
+    return msg
+
+
+def quarter_frame(frame_type, frame_value, time=0):
+    """Create a quarter_frame message."""
+    if frame_type.__class__ is not int or not 0 <= frame_type <= 7:
+        check_frame_type(frame_type)
+    if frame_value.__class__ is not int or not 0 <= frame_value <= 15:
+        check_frame_value(frame_value)
+    _check_time(time)
+
+    type_class, set_frame_type, set_frame_value, set_time = _QUARTER_FRAME
+    msg = object.__new__(type_class)
+    set_frame_type(msg, frame_type)
+    set_frame_value(msg, frame_value)
+    set_time(msg, time)
+    return msg
+
+
+def songpos(pos, time=0):
+    """Create a songpos message."""
+    if pos.__class__ is not int or not MIN_SONGPOS <= pos <= MAX_SONGPOS:
+        check_pos(pos)
+    _check_time(time)
+
+    type_class, set_pos, set_time = _SONGPOS
+    msg = object.__new__(type_class)
+    set_pos(msg, pos)
+    set_time(msg, time)
+    return msg
+
+
+def song_select(song, time=0):
+    """Create a song_select message."""
+    if song.__class__ is not int or not 0 <= song <= 127:
+        check_data_byte(song)
+    _check_time(time)
+
+    type_class, set_song, set_time = _SONG_SELECT
+    msg = object.__new__(type_class)
+    set_song(msg, song)
+    set_time(msg, time)
+    return msg
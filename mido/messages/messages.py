@@ -4,15 +4,22 @@
 
 import re
 
-from .checks import check_data, check_msgdict, check_value
-from .decode import decode_message
+from .checks import (
+    check_data,
+    make_msgdict_check,
+    make_value_check,
+)
+from .decode import decode_message, make_decoders
 from .encode import encode_message
-from .specs import REALTIME_TYPES, SPEC_BY_TYPE, make_msgdict
+from .specs import REALTIME_TYPES, SPEC_BY_TYPE, SPECS, make_msgdict
 from .strings import msg2str, str2msg
 
 
 class BaseMessage:
     """Abstract base class for messages."""
+    # Message uses slots (see _type_class()). Other subclasses get a
+    # __dict__ as usual.
+    __slots__ = ()
     is_meta = False
 
     def copy(self):
@@ -42,7 +49,7 @@ class BaseMessage:
 
         Sysex data will be returned as a list.
         """
-        data = vars(self).copy()
+        data = dict(self._msgdict())
         if data['type'] == 'sysex':
             # Make sure we return a list instead of a SysexData object.
             data['data'] = list(data['data'])
@@ -58,6 +65,11 @@ class BaseMessage:
         """
         return cls(**data)
 
+    def _msgdict(self):
+        # Return the attributes of the message as a dictionary. This
+        # is overridden by Message. Don't modify the returned value.
+        return vars(self)
+
     def _get_value_names(self):
         # This is overridden by MetaMessage.
         return list(SPEC_BY_TYPE[self.type].value_names) + ['time']
@@ -100,7 +112,7 @@ class BaseMessage:
             raise TypeError(f'can\'t compare message to {type(other)}')
 
         # This includes time in comparison.
-        return vars(self) == vars(other)
+        return self._msgdict() == other._msgdict()
 
 
 class SysexData(tuple):
@@ -110,16 +122,119 @@ class SysexData(tuple):
         return self + SysexData(other)
 
 
+# Slotted message classes by (base class, type).
+_TYPE_CLASSES = {}
+
+
+def _type_class(cls, type_):
+    """Return the slotted class for messages of type_.
+
+    Each message type has its own subclass of Message (and of any
+    class derived from it, like FrozenMessage) with a slot for each
+    attribute and the type as a class attribute. This saves a lot of
+    memory compared to storing the attributes in a dictionary. The
+    classes are created the first time they are needed.
+    """
+    if '_fields' in cls.__dict__:
+        # Already a type class.
+        cls = cls._base
+
+    try:
+        return _TYPE_CLASSES[cls, type_]
+    except KeyError:
+        pass
+
+    if type_ not in SPEC_BY_TYPE:
+        raise LookupError(f'Unknown message type {type_!r}')
+
+    fields = SPEC_BY_TYPE[type_].value_names + ('time',)
+    type_class = type(cls.__name__, (cls,), {
+        '__slots__': fields,
+        '__module__': cls.__module__,
+        '__qualname__': cls.__qualname__,
+        'type': type_,
+        '_fields': fields,
+        '_base': cls,
+        # Validators specialized for the type.
+        '_check': staticmethod(make_msgdict_check(type_)),
+        '_value_checks': {name: make_value_check(name) for name in fields},
+    })
+
+    # Setting the slots through their descriptors bypasses
+    # __setattr__(), which is reserved for users.
+    type_class._setters = tuple((name, getattr(type_class, name).__set__)
+                                for name in fields)
+
+    _TYPE_CLASSES[cls, type_] = type_class
+    # For quick lookup in copy().
+    _TYPE_CLASSES[type_class, type_] = type_class
+    return type_class
+
+
+# Decoders by status byte for each class, see from_bytes().
+_DECODERS = {}
+
+
+def _decoders(cls):
+    try:
+        return _DECODERS[cls]
+    except KeyError:
+        decoders = make_decoders(lambda type_: _type_class(cls, type_))
+        _DECODERS[cls] = decoders
+        return decoders
+
+
+def _from_msgdict(cls, msgdict):
+    """Create a message from a message dictionary without any checks."""
+    msg = object.__new__(_type_class(cls, msgdict['type']))
+    for name, set_value in msg._setters:
+        set_value(msg, msgdict[name])
+    return msg
+
+
 class Message(BaseMessage):
+    __slots__ = ()
+
+    def __new__(cls, type, skip_checks=False, **args):
+        try:
+            type_class = _TYPE_CLASSES[cls, type]
+        except (KeyError, TypeError):
+            type_class = _type_class(cls, type)
+        return object.__new__(type_class)
+
     def __init__(self, type, skip_checks=False, **args):
         msgdict = make_msgdict(type, args)
         if type == 'sysex':
             msgdict['data'] = SysexData(msgdict['data'])
 
         if not skip_checks:
-            check_msgdict(msgdict)
+            self._check(msgdict)
+
+        for name, set_value in self._setters:
+            set_value(self, msgdict[name])
 
-        vars(self).update(msgdict)
+    def _msgdict(self):
+        msgdict = {'type': self.type}
+        for name in self._fields:
+            msgdict[name] = getattr(self, name)
+        return msgdict
+
+    def __eq__(self, other):
+        if not isinstance(other, Message):
+            return BaseMessage.__eq__(self, other)
+
+        # This includes time in comparison.
+        if self.type != other.type:
+            return False
+        for name in self._fields:
+            if getattr(self, name) != getattr(other, name):
+                return False
+        return True
+
+    def __reduce__(self):
+        # The type classes can't be found by name, so pickle the
+        # base class and the attributes instead.
+        return (_from_msgdict, (self._base, self._msgdict()))
 
     def copy(self, skip_checks=False, **overrides):
         """Return a copy of the message.
@@ -133,8 +248,23 @@ class Message(BaseMessage):
         """
         if not overrides:
             # Bypass all checks.
-            msg = self.__class__.__new__(self.__class__)
-            vars(msg).update(vars(self))
+            msg = object.__new__(self.__class__)
+            for name, set_value in self._setters:
+                set_value(msg, getattr(self, name))
+            return msg
+        elif len(overrides) == 1 and 'time' in overrides:
+            # Changing only the time is very common (merging tracks,
+            # iterating over a file), so there is no need to go
+            # through a dictionary for that.
+            time = overrides['time']
+            if not skip_checks:
+                self._value_checks['time'](time)
+
+            msg = object.__new__(self.__class__)
+            for name, set_value in self._setters:
+                set_value(msg, getattr(self, name))
+            # Time is the last attribute.
+            set_value(msg, time)
             return msg
 
         if 'type' in overrides and overrides['type'] != self.type:
@@ -143,13 +273,14 @@ class Message(BaseMessage):
         if 'data' in overrides:
             overrides['data'] = bytearray(overrides['data'])
 
-        msgdict = vars(self).copy()
+        msgdict = self._msgdict()
         msgdict.update(overrides)
 
         if not skip_checks:
-            check_msgdict(msgdict)
+            self._check(msgdict)
 
-        return self.__class__(skip_checks=skip_checks, **msgdict)
+        # The dictionary has already been checked.
+        return self.__class__(skip_checks=True, **msgdict)
 
     @classmethod
     def from_bytes(cl, data, time=0):
@@ -159,12 +290,23 @@ class Message(BaseMessage):
 
         This is the reverse of msg.bytes() or msg.bin().
         """
-        msg = cl.__new__(cl)
+        try:
+            status_byte = data[0]
+        except (LookupError, TypeError):
+            pass
+        else:
+            if status_byte.__class__ is int:
+                decoder = _decoders(cl).get(status_byte)
+                if decoder is not None:
+                    msg = decoder(data, time)
+                    if msg is not None:
+                        return msg
+
+        # Sysex, invalid messages and unusual input.
         msgdict = decode_message(data, time=time)
         if 'data' in msgdict:
             msgdict['data'] = SysexData(msgdict['data'])
-        vars(msg).update(msgdict)
-        return msg
+        return _from_msgdict(cl, msgdict)
 
     @classmethod
     def from_hex(cl, text, time=0, sep=None):
@@ -199,27 +341,32 @@ class Message(BaseMessage):
             return SPEC_BY_TYPE[self.type].length
 
     def __str__(self):
-        return msg2str(vars(self))
+        return msg2str(self._msgdict())
 
     def _setattr(self, name, value):
         if name == 'type':
             raise AttributeError('type attribute is read only')
-        elif name not in vars(self):
+        elif name not in self._fields:
             raise AttributeError('{} message has no '
                                  'attribute {}'.format(self.type,
                                                        name))
         else:
-            check_value(name, value)
+            self._value_checks[name](value)
             if name == 'data':
-                vars(self)['data'] = SysexData(value)
-            else:
-                vars(self)[name] = value
+                value = SysexData(value)
+            object.__setattr__(self, name, value)
 
     __setattr__ = _setattr
 
     def bytes(self):
         """Encode message and return as a list of integers."""
-        return encode_message(vars(self))
+        return encode_message(self._msgdict())
+
+
+# Create the classes for all message types up front.
+for _spec in SPECS:
+    _type_class(Message, _spec.type)
+del _spec
 
 
 def parse_string(text):
@@ -264,4 +411,4 @@ def format_as_string(msg, include_time=True):
 
     To leave out the time attribute, pass include_time=False.
     """
-    return msg2str(vars(msg), include_time=include_time)
+    return msg2str(msg._msgdict(), include_time=include_time)
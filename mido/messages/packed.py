@@ -0,0 +1,185 @@
+# SPDX-FileCopyrightText: 2026 Mido project
+#
+# SPDX-License-Identifier: MIT
+
+"""Messages packed into a single integer.
+
+All messages except sysex are at most 3 bytes long, so they fit in
+an integer as::
+
+    status_byte | data_byte_1 << 8 | data_byte_2 << 16
+
+This is a very compact way to store large numbers of messages, for
+example in an array('I').
+"""
+from .checks import check_time
+from .messages import BaseMessage, Message
+from .specs import MIN_PITCHWHEEL, SPEC_BY_STATUS, SPEC_BY_TYPE
+from .strings import msg2str
+
+
+def _data1(packed):
+    return (packed >> 8) & 0x7f
+
+
+def _data2(packed):
+    return (packed >> 16) & 0x7f
+
+
+def _channel(packed):
+    return packed & 0x0f
+
+
+def _pitch(packed):
+    return (_data1(packed) | _data2(packed) << 7) + MIN_PITCHWHEEL
+
+
+def _pos(packed):
+    return _data1(packed) | _data2(packed) << 7
+
+
+def _frame_type(packed):
+    return _data1(packed) >> 4
+
+
+def _frame_value(packed):
+    return _data1(packed) & 0x0f
+
+
+def _make_getters(spec):
+    names = [name for name in spec.value_names if name != 'channel']
+
+    if spec.type == 'pitchwheel':
+        getters = {'pitch': _pitch}
+    elif spec.type == 'songpos':
+        getters = {'pos': _pos}
+    elif spec.type == 'quarter_frame':
+        getters = {'frame_type': _frame_type, 'frame_value': _frame_value}
+    else:
+        getters = dict(zip(names, [_data1, _data2]))
+
+    getters['channel'] = _channel
+
+    # Same order as the attributes of a normal message.
+    return {name: getters[name] for name in spec.value_names}
+
+
+# Functions that get each attribute from the packed integer, by type.
+_GETTERS = {spec.type: _make_getters(spec)
+            for spec in SPEC_BY_TYPE.values()
+            if spec.type != 'sysex'}
+
+
+def pack_message(msg):
+    """Return the message packed into an integer.
+
+    Raises ValueError for sysex and meta messages, which don't fit.
+    """
+    if msg.is_meta or msg.type == 'sysex':
+        raise ValueError(f"can't pack {msg.type} message")
+
+    packed = 0
+    for i, byte in enumerate(msg.bytes()):
+        packed |= byte << (8 * i)
+    return packed
+
+
+def _from_packed(packed, time):
+    # Create a packed message without any checks.
+    msg = PackedMessage.__new__(PackedMessage)
+    object.__setattr__(msg, 'packed', packed)
+    object.__setattr__(msg, 'time', time)
+    return msg
+
+
+class PackedMessage(BaseMessage):
+    """A message stored as a packed integer and a time.
+
+    The attributes are computed from the integer when you access
+    them, so a PackedMessage takes up very little memory. Packed
+    messages are immutable. Use copy() to change attributes or
+    unpack() to get a normal message.
+
+    packed is status_byte | data_byte_1 << 8 | data_byte_2 << 16.
+    """
+    __slots__ = ('packed', 'time')
+
+    def __init__(self, packed, time=0):
+        spec = SPEC_BY_STATUS.get(packed & 0xff)
+        if spec is None or spec.type == 'sysex':
+            raise ValueError(
+                f'invalid status byte in packed message {packed:#x}')
+        elif packed >> (8 * spec.length) or packed & 0x808000:
+            raise ValueError(
+                f'invalid data byte in packed message {packed:#x}')
+        check_time(time)
+
+        object.__setattr__(self, 'packed', packed)
+        object.__setattr__(self, 'time', time)
+
+    @staticmethod
+    def from_message(msg):
+        """Pack a message.
+
+        Raises ValueError for sysex and meta messages.
+        """
+        return _from_packed(pack_message(msg), msg.time)
+
+    @property
+    def type(self):
+        return SPEC_BY_STATUS[self.packed & 0xff].type
+
+    def __getattr__(self, name):
+        # Only called for attributes that were not found, that is
+        # the message specific ones.
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        getter = _GETTERS[self.type].get(name)
+        if getter is None:
+            raise AttributeError(
+                f'{self.type} message has no attribute {name}')
+        return getter(self.packed)
+
+    def _msgdict(self):
+        msgdict = {'type': self.type}
+        for name, getter in _GETTERS[msgdict['type']].items():
+            msgdict[name] = getter(self.packed)
+        msgdict['time'] = self.time
+        return msgdict
+
+    def __reduce__(self):
+        return (self.__class__, (self.packed, self.time))
+
+    def unpack(self):
+        """Return the message as a normal Message."""
+        return Message(skip_checks=True, **self._msgdict())
+
+    def copy(self, skip_checks=False, **overrides):
+        """Return a copy of the message with the passed attributes changed.
+
+        The copy is also a packed message.
+        """
+        if not overrides:
+            return self
+        elif list(overrides) == ['time']:
+            if not skip_checks:
+                check_time(overrides['time'])
+            return _from_packed(self.packed, overrides['time'])
+        else:
+            msg = self.unpack().copy(skip_checks=skip_checks, **overrides)
+            return self.from_message(msg)
+
+    def bytes(self):
+        """Encode message and return as a list of integers."""
+        length = SPEC_BY_STATUS[self.packed & 0xff].length
+        return [(self.packed >> (8 * i)) & 0xff for i in range(length)]
+
+    def __len__(self):
+        return SPEC_BY_STATUS[self.packed & 0xff].length
+
+    def __str__(self):
+        return msg2str(self._msgdict())
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.packed:#x}, time={self.time!r})'
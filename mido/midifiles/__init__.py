@@ -3,18 +3,30 @@
 # SPDX-License-Identifier: MIT
 
 from .meta import KeySignatureError, MetaMessage, UnknownMetaMessage
-from .midifiles import MidiFile
-from .tracks import MidiTrack, merge_tracks
+from .midifiles import MidiFile, MidiFileWriter, iter_events, load_many, probe
+from .playback import Playback, Schedule, SystemClock, VirtualClock
+from .tempomap import TempoMap
+from .tracks import MidiTrack, PackedTrack, merge_tracks
 from .units import bpm2tempo, second2tick, tempo2bpm, tick2second
 
 __all__ = [
     "KeySignatureError",
     "MetaMessage",
     "MidiFile",
+    "MidiFileWriter",
     "MidiTrack",
+    "PackedTrack",
+    "Playback",
+    "Schedule",
+    "SystemClock",
+    "TempoMap",
     "UnknownMetaMessage",
+    "VirtualClock",
     "bpm2tempo",
+    "iter_events",
+    "load_many",
     "merge_tracks",
+    "probe",
     "second2tick",
     "tempo2bpm",
     "tick2second",
@@ -0,0 +1,117 @@
+# SPDX-FileCopyrightText: 2026 Mido project
+#
+# SPDX-License-Identifier: MIT
+
+"""Columnar NumPy representation of MIDI tracks.
+
+Each track is converted to a structured array with one row per
+message and a list of the messages that don't fit in the columns (meta
+messages and sysex). This makes it possible to filter, transpose and
+compute statistics on large files with vectorized operations.
+
+The columns are:
+
+    tick      absolute time in ticks
+    delta     delta time in ticks (the time attribute)
+    type      message type as an index into TYPES
+    channel   channel, or -1 for messages without a channel
+    note      note, control, program, song or frame_type
+    velocity  velocity, value or frame_value
+    pitch     pitchwheel pitch or song position
+    meta      index into the list of meta messages and sysex for this
+              track, or -1
+
+Requires NumPy.
+"""
+import numpy as np
+
+from ..messages import Message
+from ..messages.specs import SPECS
+from .tracks import MidiTrack
+
+# Meta messages all share the type 'meta'.
+TYPES = [spec.type for spec in SPECS] + ['meta']
+TYPE_CODES = {type_: code for code, type_ in enumerate(TYPES)}
+
+DTYPE = np.dtype([
+    ('tick', np.int64),
+    ('delta', np.int64),
+    ('type', np.uint8),
+    ('channel', np.int8),
+    ('note', np.uint8),
+    ('velocity', np.uint8),
+    ('pitch', np.int16),
+    ('meta', np.int32),
+])
+
+# Which column each message attribute is stored in.
+_COLUMNS = {
+    'channel': 3,
+    'note': 4,
+    'control': 4,
+    'program': 4,
+    'song': 4,
+    'frame_type': 4,
+    'velocity': 5,
+    'value': 5,
+    'frame_value': 5,
+    'pitch': 6,
+    'pos': 6,
+}
+
+_FIELDS = {spec.type: tuple((name, _COLUMNS[name])
+                            for name in spec.value_names
+                            if name in _COLUMNS)
+           for spec in SPECS}
+
+
+def track_to_array(track):
+    """Convert a track to a structured array.
+
+    Returns (array, messages) where messages is a list of the meta
+    messages and sysex messages in the track. Their rows in the array
+    have the index of the message in the meta column.
+    """
+    rows = []
+    messages = []
+    tick = 0
+
+    for msg in track:
+        tick += msg.time
+
+        if msg.is_meta or msg.type == 'sysex':
+            code = TYPE_CODES['meta' if msg.is_meta else 'sysex']
+            rows.append((tick, msg.time, code, -1, 0, 0, 0, len(messages)))
+            messages.append(msg)
+        else:
+            row = [tick, msg.time, TYPE_CODES[msg.type], -1, 0, 0, 0, -1]
+            for name, column in _FIELDS[msg.type]:
+                row[column] = getattr(msg, name)
+            rows.append(tuple(row))
+
+    return np.array(rows, dtype=DTYPE), messages
+
+
+def array_to_track(array, messages):
+    """Convert a structured array back to a track.
+
+    This is the reverse of track_to_array(). Delta times are computed
+    from the tick column, which means rows can be removed or have
+    their tick changed without fixing up the delta column. Rows are
+    sorted by tick (keeping the order of rows with the same tick).
+
+    Messages are validated as they are created.
+    """
+    array = array[np.argsort(array['tick'], kind='stable')]
+    deltas = np.diff(array['tick'], prepend=0)
+
+    track = MidiTrack()
+    for row, delta in zip(array.tolist(), deltas.tolist()):
+        if row[7] >= 0:
+            track.append(messages[row[7]].copy(time=delta))
+        else:
+            type_ = TYPES[row[2]]
+            values = {name: row[column] for name, column in _FIELDS[type_]}
+            track.append(Message(type_, time=delta, **values))
+
+    return track
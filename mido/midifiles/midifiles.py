@@ -19,21 +19,26 @@ http://www.recordingblogs.com/sa/tabid/82/EntryId/44/MIDI-Part-XIII-Delta-time-a
 http://www.sonicspot.com/guide/midifiles.html
 """
 
+import mmap
+import os
 import string
 import struct
 import time
+from array import array
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
 from numbers import Integral
 
 from ..messages import SPEC_BY_STATUS, Message
+from ..messages.messages import _type_class
+from ..messages.specs import MIN_PITCHWHEEL
 from .meta import MetaMessage, build_meta_message, encode_variable_int, meta_charset
-from .tracks import MidiTrack, fix_end_of_track, merge_tracks
+from .playback import Playback, Schedule
+from .tempomap import DEFAULT_TEMPO, DEFAULT_TICKS_PER_BEAT, TempoMap
+from .tracks import MergedTrack, MidiTrack, PackedTrack
 from .units import tick2second
 
-# The default tempo is 120 BPM.
-# (500000 microseconds per beat (quarter note).)
-DEFAULT_TEMPO = 500000
-DEFAULT_TICKS_PER_BEAT = 480
-
 # Maximum message length to attempt to read.
 MAX_MESSAGE_LENGTH = 1000000
 
@@ -62,19 +67,24 @@ class DebugFileWrapper:
         return self.file.tell()
 
 
-def read_byte(self):
-    byte = self.read(1)
-    if byte == b'':
-        raise EOFError
-    else:
-        return ord(byte)
+class BufferReader:
+    """Read from a buffer as if it was a file.
 
+    read() returns memoryview slices of the buffer, so nothing is
+    copied until the data is decoded. This is used to parse memory
+    mapped files.
+    """
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def read(self, size):
+        data = self.data[self.pos:self.pos + size]
+        self.pos += len(data)
+        return data
 
-def read_bytes(infile, size):
-    if size > MAX_MESSAGE_LENGTH:
-        raise OSError('Message length {} exceeds maximum length {}'.format(
-            size, MAX_MESSAGE_LENGTH))
-    return [read_byte(infile) for _ in range(size)]
+    def tell(self):
+        return self.pos
 
 
 def _dbg(text=''):
@@ -113,16 +123,92 @@ def read_file_header(infile):
         return struct.unpack('>hhh', data[:6])
 
 
-def read_message(infile, status_byte, peek_data, delta, clip=False):
-    try:
-        spec = SPEC_BY_STATUS[status_byte]
-    except LookupError as le:
-        raise OSError(f'undefined status byte 0x{status_byte:02x}') from le
+def _decode_variable_int(data, pos):
+    """Decode a variable length integer starting at data[pos].
+
+    Returns (value, pos) where pos is the position after the last byte.
+    """
+    value = 0
+
+    while True:
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7f)
+        if byte < 0x80:
+            return value, pos
 
-    # Subtract 1 for status byte.
-    size = spec.length - 1 - len(peek_data)
-    data_bytes = peek_data + read_bytes(infile, size)
 
+def _scan_track(data):
+    """Scan the events of an MTrk chunk without decoding them.
+
+    data is the chunk payload (any buffer that supports indexing and
+    slicing, such as bytes, memoryview or mmap).
+
+    Yields (delta, status_byte, meta_type, start, end) for each event
+    where data[start:end] is the event payload. meta_type is None for
+    everything but meta messages. Running status is resolved so the
+    payload of a channel message always includes all its data bytes.
+
+    Raises OSError if an event runs past the end of the chunk.
+    """
+    size = len(data)
+    pos = 0
+    last_status = None
+
+    try:
+        while pos < size:
+            delta, pos = _decode_variable_int(data, pos)
+
+            status_byte = data[pos]
+            pos += 1
+            meta_type = None
+
+            if status_byte < 0x80:
+                if last_status is None:
+                    raise OSError('running status without last_status')
+                # The byte we just read is the first data byte.
+                start = pos - 1
+                status_byte = last_status
+            else:
+                if status_byte != 0xff:
+                    # Meta messages don't set running status.
+                    last_status = status_byte
+                start = pos
+
+            if status_byte == 0xff:
+                meta_type = data[pos]
+                length, start = _decode_variable_int(data, pos + 1)
+                end = start + length
+            elif status_byte in (0xf0, 0xf7):
+                # TODO: I'm not quite clear on the difference between
+                # f0 and f7 events.
+                length, start = _decode_variable_int(data, pos)
+                end = start + length
+            else:
+                try:
+                    spec = SPEC_BY_STATUS[status_byte]
+                except LookupError as le:
+                    raise OSError(
+                        f'undefined status byte 0x{status_byte:02x}') from le
+
+                # Subtract 1 for status byte.
+                length = spec.length - 1
+                end = max(pos, start + length)
+
+            if length > MAX_MESSAGE_LENGTH:
+                raise OSError(
+                    'Message length {} exceeds maximum length {}'.format(
+                        length, MAX_MESSAGE_LENGTH))
+            elif end > size:
+                raise IndexError
+
+            yield delta, status_byte, meta_type, start, end
+            pos = end
+    except IndexError:
+        raise OSError('message runs past end of track') from None
+
+
+def _decode_message(status_byte, data_bytes, delta, clip=False):
     if clip:
         data_bytes = [byte if byte < 127 else 127 for byte in data_bytes]
     else:
@@ -130,13 +216,10 @@ def read_message(infile, status_byte, peek_data, delta, clip=False):
             if byte > 127:
                 raise OSError('data byte must be in range 0..127')
 
-    return Message.from_bytes([status_byte] + data_bytes, time=delta)
-
+    return Message.from_bytes([status_byte, *data_bytes], time=delta)
 
-def read_sysex(infile, delta, clip=False):
-    length = read_variable_int(infile)
-    data = read_bytes(infile, length)
 
+def _decode_sysex(data, delta, clip=False):
     # Strip start and end bytes.
     # TODO: is this necessary?
     if data and data[0] == 0xf0:
@@ -144,32 +227,46 @@ def read_sysex(infile, delta, clip=False):
     if data and data[-1] == 0xf7:
         data = data[:-1]
 
+    # Checking the bytes one by one in Python made loading sysex dumps
+    # slow, so this is done with max() instead.
     if clip:
         data = [byte if byte < 127 else 127 for byte in data]
+    elif max(data, default=0) > 127:
+        raise ValueError('data byte must be in range 0..127')
 
-    return Message('sysex', data=data, time=delta)
+    return Message('sysex', data=data, time=delta, skip_checks=True)
 
 
-def read_variable_int(infile):
-    delta = 0
+def decode_track(data, debug=False, clip=False):
+    """Decode the payload of an MTrk chunk and return a MidiTrack.
 
-    while True:
-        byte = read_byte(infile)
-        delta = (delta << 7) | (byte & 0x7f)
-        if byte < 0x80:
-            return delta
+    data can be any buffer that supports indexing and slicing.
+    """
+    messages = []
 
+    for delta, status_byte, meta_type, start, end in _scan_track(data):
+        if debug:
+            _dbg('Message:')
+            _dbg(f'-> delta={delta}')
 
-def read_meta_message(infile, delta):
-    meta_type = read_byte(infile)
-    length = read_variable_int(infile)
-    data = read_bytes(infile, length)
-    return build_meta_message(meta_type, data, delta)
+        if status_byte == 0xff:
+            msg = build_meta_message(meta_type, data[start:end], delta)
+        elif status_byte in (0xf0, 0xf7):
+            msg = _decode_sysex(data[start:end], delta, clip)
+        else:
+            msg = _decode_message(status_byte, data[start:end], delta, clip)
 
+        messages.append(msg)
 
-def read_track(infile, debug=False, clip=False):
-    track = MidiTrack()
+        if debug:
+            _dbg(f'-> {msg!r}')
+            _dbg()
 
+    return MidiTrack(messages)
+
+
+def read_track_data(infile, debug=False):
+    """Read an MTrk chunk and return its payload as a memoryview."""
     name, size = read_chunk_header(infile)
 
     if name != b'MTrk':
@@ -179,51 +276,313 @@ def read_track(infile, debug=False, clip=False):
         _dbg(f'-> size={size}')
         _dbg()
 
-    start = infile.tell()
-    last_status = None
+    # Read the whole chunk in one go so it can be decoded from memory.
+    data = infile.read(size)
+    if len(data) < size:
+        raise EOFError
 
-    while True:
-        # End of track reached.
-        if infile.tell() - start == size:
-            break
+    return memoryview(data)
 
-        if debug:
-            _dbg('Message:')
 
-        delta = read_variable_int(infile)
+def read_track(infile, debug=False, clip=False):
+    data = read_track_data(infile, debug=debug)
+    return decode_track(data, debug=debug, clip=clip)
+
+
+def iter_events(filename_or_buffer):
+    """Generate the raw events of a MIDI file without creating messages.
+
+    Takes a filename or a buffer (such as bytes or an mmap) with the
+    contents of a MIDI file and yields (track_index, tick, status_byte,
+    data) for each event, where tick is the absolute time in ticks
+    from the start of the track.
+
+    Running status is resolved, so status_byte is always the real
+    status byte of the event and data is a bytes object with its data
+    bytes. For meta events (status_byte 0xff) data starts with the meta
+    type byte followed by the payload. For sysex events (0xf0 and 0xf7)
+    data is the payload as stored in the file.
+
+    No validation is done on the data bytes. This is much faster than
+    reading the file into a MidiFile when all you need is to look at
+    the raw events, for example to count notes.
+    """
+    if isinstance(filename_or_buffer, (str, os.PathLike)):
+        with open(filename_or_buffer, 'rb') as infile:
+            filename_or_buffer = infile.read()
+
+    infile = BufferReader(filename_or_buffer)
+    _, num_tracks, _ = read_file_header(infile)
+
+    for track_index in range(num_tracks):
+        # Slicing bytes gives us bytes, so copy the chunk once up front.
+        data = bytes(read_track_data(infile))
+        tick = 0
+        for delta, status_byte, meta_type, start, end in _scan_track(data):
+            tick += delta
+            if meta_type is None:
+                yield track_index, tick, status_byte, data[start:end]
+            else:
+                yield (track_index, tick, status_byte,
+                       bytes([meta_type]) + data[start:end])
+
+
+def probe(filename, charset='latin1'):
+    """Return a summary of a MIDI file without decoding all of it.
+
+    Only the track_name and set_tempo meta messages are decoded. All
+    other events are skipped over, which makes this a lot faster than
+    creating a MidiFile.
+
+    Returns a dictionary like this::
+
+        {'type': 1,
+         'ticks_per_beat': 480,
+         'tracks': [{'name': 'Piano', 'size': 5120, 'events': 1023,
+                     'ticks': 30720},
+                    ...],
+         'tempo_map': [(0, 500000), (7680, 400000)],
+         'length': 61.5}
+
+    size is the size of the MTrk chunk in bytes, events the number of
+    messages in the track and ticks the total length of the track.
+    tempo_map is a list of (tick, tempo) for every set_tempo message in
+    the file in playback order. length is the playback time in seconds
+    (the same as MidiFile.length) or None for type 2 files.
+    """
+    with open(filename, 'rb') as infile:
+        type_, num_tracks, ticks_per_beat = read_file_header(infile)
+        tracks = []
+        tempo_map = []
+
+        with meta_charset(charset):
+            for _ in range(num_tracks):
+                data = read_track_data(infile)
+                name = None
+                tick = 0
+                events = 0
+
+                for delta, _, meta_type, start, end in _scan_track(data):
+                    tick += delta
+                    events += 1
+                    if meta_type == 0x03 and name is None:
+                        name = build_meta_message(meta_type,
+                                                  data[start:end]).name
+                    elif meta_type == 0x51:
+                        msg = build_meta_message(meta_type, data[start:end])
+                        tempo_map.append((tick, msg.tempo))
+
+                tracks.append({'name': '' if name is None else name,
+                               'size': len(data),
+                               'events': events,
+                               'ticks': tick})
+
+    # Sort by tick but keep track order for tempo changes at the same
+    # tick, the same way merge_tracks() does.
+    tempo_map.sort(key=lambda item: item[0])
+
+    if type_ == 2:
+        length = None
+    else:
+        end_tick = max((track['ticks'] for track in tracks), default=0)
+        length = TempoMap(tempo_map, ticks_per_beat, end_tick).length
+
+    return {'type': type_,
+            'ticks_per_beat': ticks_per_beat,
+            'tracks': tracks,
+            'tempo_map': tempo_map,
+            'length': length}
+
+
+def _lazy_method(name):
+    def method(self, *args, **kwargs):
+        self._materialize()
+        # The class is now MidiTrack so this finds the real method.
+        return getattr(self, name)(*args, **kwargs)
+
+    method.__name__ = name
+    return method
+
+
+class LazyMidiTrack(MidiTrack):
+    """A track that is decoded the first time it is used.
+
+    This is what MidiFile(lazy=True) puts in its track list. The
+    track holds on to the raw MTrk payload until any list method is
+    called, at which point the messages are decoded and the object
+    turns into a plain MidiTrack.
+
+    The name property is looked up from the raw data without decoding
+    the rest of the track.
+
+    When a file is saved, tracks that have not been decoded are
+    written out exactly as they were read, without encoding them
+    again. (Decoding is the only way to get at the messages, so an
+    undecoded track can not have been modified.)
+    """
+    def __init__(self, data, charset='latin1', debug=False, clip=False):
+        self._data = data
+        self._charset = charset
+        self._debug = debug
+        self._clip = clip
+
+    def _materialize(self):
+        with meta_charset(self._charset):
+            track = decode_track(self._data,
+                                 debug=self._debug,
+                                 clip=self._clip)
+
+        for name in ['_data', '_charset', '_debug', '_clip']:
+            delattr(self, name)
+        self.__class__ = MidiTrack
+        list.extend(self, track)
+
+    def _original_data(self):
+        # Return the raw data if it can be saved as it is. Clipping
+        # would have changed the data, and tracks without an
+        # end_of_track at the end must have one added. The last three
+        # bytes can look like one even when they are not, so the
+        # events have to be scanned to find the last one.
+        if self._clip:
+            return None
+
+        last = deque(_scan_track(self._data), maxlen=1)
+        if not last:
+            return None
+        _, status_byte, meta_type, start, end = last[0]
+        if status_byte == 0xff and meta_type == 0x2f and start == end:
+            return self._data
+        else:
+            return None
+
+    def _tempo_messages(self):
+        # Return the set_tempo messages and an end_of_track with the
+        # time of the other messages added to them. This is all the
+        # tempo map needs, and it leaves the track undecoded.
+        data = self._data
+        delta = 0
+        for event_delta, status_byte, meta_type, start, end \
+                in _scan_track(data):
+            delta += event_delta
+            if status_byte == 0xff and meta_type == 0x51:
+                yield build_meta_message(meta_type, data[start:end], delta)
+                delta = 0
+        yield MetaMessage('end_of_track', time=delta)
 
-        if debug:
-            _dbg(f'-> delta={delta}')
+    # list.__add__() reads the list storage directly instead of
+    # iterating, and the storage is empty until the track is decoded.
+    # Other list operations iterate over the track, which decodes it.
 
-        status_byte = read_byte(infile)
+    def __add__(self, other):
+        self._materialize()
+        if other.__class__ is LazyMidiTrack:
+            other._materialize()
+        return self + other
 
-        if status_byte < 0x80:
-            if last_status is None:
-                raise OSError('running status without last_status')
-            peek_data = [status_byte]
-            status_byte = last_status
-        else:
-            if status_byte != 0xff:
-                # Meta messages don't set running status.
-                last_status = status_byte
-            peek_data = []
+    def __radd__(self, other):
+        self._materialize()
+        return other + self
 
-        if status_byte == 0xff:
-            msg = read_meta_message(infile, delta)
-        elif status_byte in [0xf0, 0xf7]:
-            # TODO: I'm not quite clear on the difference between
-            # f0 and f7 events.
-            msg = read_sysex(infile, delta, clip)
+    @property
+    def name(self):
+        data = self._data
+        for _, status_byte, meta_type, start, end in _scan_track(data):
+            if status_byte == 0xff and meta_type == 0x03:
+                with meta_charset(self._charset):
+                    return build_meta_message(meta_type, data[start:end]).name
+        else:
+            return ''
+
+    @name.setter
+    def name(self, name):
+        self._materialize()
+        self.name = name
+
+
+for _name in ['__len__', '__iter__', '__reversed__', '__contains__',
+              '__getitem__', '__setitem__', '__delitem__',
+              '__eq__', '__ne__', '__lt__', '__le__', '__gt__', '__ge__',
+              '__iadd__', '__mul__', '__rmul__', '__imul__',
+              '__repr__', '__reduce_ex__',
+              'append', 'extend', 'insert', 'pop', 'remove', 'clear',
+              'index', 'count', 'sort', 'reverse', 'copy']:
+    setattr(LazyMidiTrack, _name, _lazy_method(_name))
+del _name
+
+
+def _pack_track(track):
+    """Pack a track into a compact form for sending to another process.
+
+    Pickling messages one by one would repeat the class and attribute
+    names of every message. Instead each message becomes a tuple of
+    attribute values and an index into a table of kinds, where a kind
+    is (Message, type) or (meta class, attribute names).
+    """
+    kinds = {}
+    indexes = array('H')
+    values = []
+    for msg in track:
+        if msg.is_meta:
+            attrs = vars(msg)
+            kind = (msg.__class__, tuple(attrs))
+            values.append(tuple(attrs.values()))
+        else:
+            kind = (Message, msg.type)
+            values.append(tuple([getattr(msg, name) for name in msg._fields]))
+        indexes.append(kinds.setdefault(kind, len(kinds)))
+    return list(kinds), indexes, values
+
+
+def _unpack_track(packed):
+    """Rebuild a track packed by _pack_track()."""
+    kinds, indexes, values = packed
+
+    # Look up the class and slot setters once for each kind instead
+    # of once for each message.
+    builders = []
+    for cls, type_or_names in kinds:
+        if cls is Message:
+            type_class = _type_class(cls, type_or_names)
+            setters = tuple([set_value
+                             for _, set_value in type_class._setters])
+            builders.append((type_class, setters, None))
         else:
-            msg = read_message(infile, status_byte, peek_data, delta, clip)
+            builders.append((cls, None, type_or_names))
+
+    # The messages were validated when they were decoded.
+    messages = []
+    append = messages.append
+    new = object.__new__
+    for index, msg_values in zip(indexes, values):
+        cls, setters, names = builders[index]
+        msg = new(cls)
+        if setters is None:
+            vars(msg).update(zip(names, msg_values))
+        else:
+            for set_value, value in zip(setters, msg_values):
+                set_value(msg, value)
+        append(msg)
+    return MidiTrack(messages)
 
-        track.append(msg)
 
-        if debug:
-            _dbg(f'-> {msg!r}')
-            _dbg()
+def _decode_track_packed(data, charset, clip):
+    # This runs in a worker process.
+    with meta_charset(charset):
+        return _pack_track(decode_track(data, clip=clip))
+
+
+def decode_tracks_parallel(chunks, workers, charset='latin1', clip=False):
+    """Decode MTrk payloads in a pool of worker processes.
 
-    return track
+    Returns a list of MidiTracks in the same order as chunks.
+    """
+    chunks = [bytes(data) for data in chunks]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(_decode_track_packed,
+                               chunks,
+                               [charset] * len(chunks),
+                               [clip] * len(chunks))
+        return [_unpack_track(packed) for packed in results]
 
 
 def write_chunk(outfile, name, data):
@@ -235,48 +594,167 @@ def write_chunk(outfile, name, data):
     outfile.write(data)
 
 
-def write_track(outfile, track):
-    data = bytearray()
+def _write_time(data, time):
+    # Checking for int first is much faster than the Integral ABC.
+    if not (isinstance(time, int) or isinstance(time, Integral)):
+        raise ValueError('message time must be int in MIDI file')
+    if time < 0:
+        raise ValueError('message time must be non-negative in MIDI file')
+
+    if time < 0x80:
+        data.append(time)
+    else:
+        data.extend(encode_variable_int(time))
 
-    running_status_byte = None
-    for msg in fix_end_of_track(track):
-        if not isinstance(msg.time, Integral):
-            raise ValueError('message time must be int in MIDI file')
-        if msg.time < 0:
-            raise ValueError('message time must be non-negative in MIDI file')
 
-        if msg.is_realtime:
-            raise ValueError('realtime messages are not allowed in MIDI files')
+def _write_status(data, status_byte, running_status_byte):
+    if status_byte != running_status_byte:
+        data.append(status_byte)
 
-        data.extend(encode_variable_int(msg.time))
 
-        if msg.is_meta:
-            data.extend(msg.bytes())
-            running_status_byte = None
-        elif msg.type == 'sysex':
-            data.append(0xf0)
-            # length (+ 1 for end byte (0xf7))
-            data.extend(encode_variable_int(len(msg.data) + 1))
-            data.extend(msg.data)
-            data.append(0xf7)
-            running_status_byte = None
+def _encode_note_off(data, msg, running_status_byte):
+    status_byte = 0x80 | msg.channel
+    _write_status(data, status_byte, running_status_byte)
+    data.append(msg.note)
+    data.append(msg.velocity)
+    return status_byte
+
+
+def _encode_note_on(data, msg, running_status_byte):
+    status_byte = 0x90 | msg.channel
+    _write_status(data, status_byte, running_status_byte)
+    data.append(msg.note)
+    data.append(msg.velocity)
+    return status_byte
+
+
+def _encode_control_change(data, msg, running_status_byte):
+    status_byte = 0xb0 | msg.channel
+    _write_status(data, status_byte, running_status_byte)
+    data.append(msg.control)
+    data.append(msg.value)
+    return status_byte
+
+
+def _encode_program_change(data, msg, running_status_byte):
+    status_byte = 0xc0 | msg.channel
+    _write_status(data, status_byte, running_status_byte)
+    data.append(msg.program)
+    return status_byte
+
+
+def _encode_pitchwheel(data, msg, running_status_byte):
+    status_byte = 0xe0 | msg.channel
+    _write_status(data, status_byte, running_status_byte)
+    pitch = msg.pitch - MIN_PITCHWHEEL
+    data.append(pitch & 0x7f)
+    data.append(pitch >> 7)
+    return status_byte
+
+
+def _encode_sysex(data, msg, running_status_byte):
+    data.append(0xf0)
+    # length (+ 1 for end byte (0xf7))
+    data.extend(encode_variable_int(len(msg.data) + 1))
+    data.extend(msg.data)
+    data.append(0xf7)
+    return None
+
+
+def _encode_other(data, msg, running_status_byte):
+    if msg.is_meta:
+        data.extend(msg.bytes())
+        return None
+    elif msg.is_realtime:
+        raise ValueError('realtime messages are not allowed in MIDI files')
+
+    msg_bytes = msg.bytes()
+    status_byte = msg_bytes[0]
+
+    if status_byte == running_status_byte:
+        data.extend(msg_bytes[1:])
+    else:
+        data.extend(msg_bytes)
+
+    if status_byte < 0xf0:
+        return status_byte
+    else:
+        return None
+
+
+# Each encoder appends the message to data and returns the new
+# running status byte. Types that are not listed here go through
+# _encode_other().
+_TRACK_ENCODERS = {
+    'note_off': _encode_note_off,
+    'note_on': _encode_note_on,
+    'control_change': _encode_control_change,
+    'program_change': _encode_program_change,
+    'pitchwheel': _encode_pitchwheel,
+    'sysex': _encode_sysex,
+}
+
+
+def _encode_messages(data, messages, running_status_byte=None, accum=0):
+    # Append the messages to data. end_of_track messages are skipped
+    # and their delta time (accum) is added to the next message.
+    # Returns the new running status byte and accum.
+    for msg in messages:
+        type_ = msg.type
+        if type_ == 'end_of_track':
+            accum += msg.time
+            continue
+
+        if accum:
+            _write_time(data, accum + msg.time)
+            accum = 0
         else:
-            msg_bytes = msg.bytes()
-            status_byte = msg_bytes[0]
+            _write_time(data, msg.time)
 
-            if status_byte == running_status_byte:
-                data.extend(msg_bytes[1:])
-            else:
-                data.extend(msg_bytes)
+        encode = _TRACK_ENCODERS.get(type_, _encode_other)
+        running_status_byte = encode(data, msg, running_status_byte)
 
-            if status_byte < 0xf0:
-                running_status_byte = status_byte
-            else:
-                running_status_byte = None
+    return running_status_byte, accum
+
+
+def _encode_end_of_track(data, accum):
+    _write_time(data, accum)
+    data.extend(b'\xff\x2f\x00')
+
+
+def encode_track(track):
+    """Encode a track as the data of an MTrk chunk.
+
+    end_of_track messages are removed and one is added at the end
+    (like fix_end_of_track() does) and running status is used.
+    """
+    data = bytearray()
+    _, accum = _encode_messages(data, track)
+    _encode_end_of_track(data, accum)
+    return data
+
+
+def write_track(outfile, track):
+    data = None
+    if isinstance(track, LazyMidiTrack):
+        data = track._original_data()
+
+    if data is None:
+        data = encode_track(track)
 
     write_chunk(outfile, b'MTrk', data)
 
 
+def _same_key(key, other):
+    # Tracks are compared by identity. None means the tracks can't
+    # be compared.
+    return (key is not None and other is not None
+            and len(key) == len(other)
+            and key[:2] == other[:2]
+            and all(a[0] is b[0] and a[1:] == b[1:]
+                    for a, b in zip(key[2:], other[2:])))
+
+
 def get_seconds_per_tick(tempo, ticks_per_beat):
     # Tempo is given in microseconds per beat (default 500000).
     # At this tempo there are (500000 / 1000000) == 0.5 seconds
@@ -294,7 +772,10 @@ class MidiFile:
                  charset='latin1',
                  debug=False,
                  clip=False,
-                 tracks=None
+                 tracks=None,
+                 mmap=False,
+                 lazy=False,
+                 workers=None,
                  ):
 
         self.filename = filename
@@ -303,9 +784,15 @@ class MidiFile:
         self.charset = charset
         self.debug = debug
         self.clip = clip
+        self.lazy = lazy
+        self.workers = workers
 
         self.tracks = []
         self._merged_track = None
+        self._tempo_map = None
+        self._tempo_map_key = None
+        self._schedule = None
+        self._schedule_key = None
 
         if type not in range(3):
             raise ValueError(
@@ -316,23 +803,84 @@ class MidiFile:
         elif file is not None:
             self._load(file)
         elif self.filename is not None:
-            with open(filename, 'rb') as file:
-                self._load(file)
+            if mmap:
+                self._load_mapped(filename)
+            else:
+                with open(filename, 'rb') as file:
+                    self._load(file)
 
     @property
     def merged_track(self):
+        """All tracks merged into one, in playback order.
+
+        The merged track is cached. When tracks are modified only the
+        part of it after the earliest change is merged again. Changing
+        an attribute of a message inside a track can not be detected,
+        so you need to do ``del mid.merged_track`` after that.
+        """
         # The tracks of type 2 files are not in sync, so they can
         # not be played back like this.
         if self.type == 2:
             raise TypeError("can't merge tracks in type 2 (asynchronous) file")
 
         if self._merged_track is None:
-            self._merged_track = merge_tracks(self.tracks, skip_checks=True)
-        return self._merged_track
+            self._merged_track = MergedTrack(skip_checks=True)
+        return self._merged_track.update(self.tracks)
 
     @merged_track.deleter
     def merged_track(self):
         self._merged_track = None
+        self._schedule = None
+
+    def _tracks_key(self):
+        # Used to tell if the tracks have changed since a cached value
+        # was computed. MidiTrack counts its modifications and
+        # PackedTrack can only be appended to, so the length will do
+        # for that. Lazy tracks can't change before they are decoded,
+        # and calling len() would decode them. Changes to other kinds
+        # of tracks (like plain lists) can't be detected, so None is
+        # returned and nothing is cached.
+        if not all(isinstance(track, (MidiTrack, PackedTrack))
+                   for track in self.tracks):
+            return None
+
+        return [self.type, self.ticks_per_beat] + [
+            (track, None, 'undecoded')
+            if track.__class__ is LazyMidiTrack
+            else (track, len(track), getattr(track, '_version', None))
+            for track in self.tracks]
+
+    @property
+    def tempo_map(self):
+        """TempoMap for converting between ticks and seconds.
+
+        The tempo map is built from the set_tempo messages the first
+        time it's used and is rebuilt if tracks are added, removed or
+        modified. Changing an attribute of a message inside a track
+        can not be detected, so you need to do
+        ``del mid.tempo_map`` after that. If any track is not a
+        MidiTrack or PackedTrack the tempo map is not cached.
+        """
+        # The tracks of type 2 files are not in sync, so they have no
+        # shared tempo map.
+        if self.type == 2:
+            raise TypeError("can't make tempo map for type 2"
+                            " (asynchronous) file")
+
+        key = self._tracks_key()
+        if self._tempo_map is None or not _same_key(key,
+                                                    self._tempo_map_key):
+            tracks = [track._tempo_messages()
+                      if track.__class__ is LazyMidiTrack else track
+                      for track in self.tracks]
+            self._tempo_map = TempoMap.from_tracks(tracks,
+                                                   self.ticks_per_beat)
+            self._tempo_map_key = key
+        return self._tempo_map
+
+    @tempo_map.deleter
+    def tempo_map(self):
+        self._tempo_map = None
 
     def add_track(self, name=None):
         """Add a new track to the file.
@@ -364,44 +912,118 @@ class MidiFile:
                     self.type, num_tracks, self.ticks_per_beat))
                 _dbg()
 
+            # Decode the tracks in worker processes if asked to and
+            # there is more than one of them.
+            parallel = (self.workers is not None and self.workers > 1
+                        and num_tracks > 1
+                        and not (self.lazy or self.debug))
+            chunks = []
+
             for i in range(num_tracks):
                 if self.debug:
                     _dbg(f'Track {i}:')
 
-                self.tracks.append(read_track(infile,
-                                              debug=self.debug,
-                                              clip=self.clip))
+                data = read_track_data(infile, debug=self.debug)
+                if parallel:
+                    chunks.append(data)
+                    continue
+                elif self.lazy:
+                    track = LazyMidiTrack(data,
+                                          charset=self.charset,
+                                          debug=self.debug,
+                                          clip=self.clip)
+                else:
+                    track = decode_track(data,
+                                         debug=self.debug,
+                                         clip=self.clip)
+                self.tracks.append(track)
                 # TODO: used to ignore EOFError. I hope things still work.
 
+            if parallel:
+                self.tracks.extend(decode_tracks_parallel(chunks,
+                                                          self.workers,
+                                                          charset=self.charset,
+                                                          clip=self.clip))
+
+    def _load_mapped(self, filename):
+        with open(filename, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                # mmap() refuses to map empty files.
+                raise EOFError
+
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # The mapping is closed when the last view of it is garbage
+        # collected. (Closing it here would fail if an exception
+        # traceback still holds on to a view.)
+        self._load(BufferReader(data))
+
     @property
     def length(self):
         """Playback time in seconds.
 
-        This will be computed by going through every message in every
-        track and adding up delta times.
+        This is computed from the tempo map, which is cached until
+        the tracks change.
         """
         if self.type == 2:
             raise ValueError('impossible to compute length'
                              ' for type 2 (asynchronous) file')
 
-        return sum(msg.time for msg in self)
+        return self.tempo_map.length
 
     def __iter__(self):
-        tempo = DEFAULT_TEMPO
+        for delta, msg in self.iter_timed():
+            yield msg.copy(skip_checks=True, time=delta)
+
+    def iter_timed(self, absolute=False):
+        """Generate (seconds, message) for all messages in playback order.
+
+        By default seconds is the time since the previous message. Pass
+        absolute=True to get the time since the start of the file
+        instead.
+
+        Unlike iterating over the file this does not copy the
+        messages. You get the messages of the merged track, so their
+        time attribute is the delta time in ticks. Don't modify them.
+        """
+        # Seconds per tick for the current tempo.
+        scale = tick2second(1, self.ticks_per_beat, DEFAULT_TEMPO)
+        now = 0.0
+
         for msg in self.merged_track:
-            # Convert message time from absolute time
-            # in ticks to relative time in seconds.
+            # Convert message time from delta time in ticks
+            # to delta time in seconds.
             if msg.time > 0:
-                delta = tick2second(msg.time, self.ticks_per_beat, tempo)
+                delta = msg.time * scale
             else:
                 delta = 0
 
-            yield msg.copy(skip_checks=True, time=delta)
+            if absolute:
+                now += delta
+                yield now, msg
+            else:
+                yield delta, msg
 
             if msg.type == 'set_tempo':
-                tempo = msg.tempo
+                scale = tick2second(1, self.ticks_per_beat, msg.tempo)
 
-    def play(self, meta_messages=False, now=time.time):
+    def schedule(self):
+        """Return a Schedule for playing back the file.
+
+        The schedule has the time of each message in seconds and the
+        messages encoded as bytes, so it can be played many times
+        without doing the work again. It is cached the same way as
+        tempo_map, and play() and aplay() use it. ``del
+        mid.merged_track`` also drops the cached schedule.
+        """
+        key = self._tracks_key()
+        if self._schedule is None or not _same_key(key, self._schedule_key):
+            self._schedule = Schedule(self.iter_timed())
+            self._schedule_key = key
+        return self._schedule
+
+    def play(self, meta_messages=False, now=time.time, start=0.0,
+             lookahead=None, clock=None):
         """Play back all tracks.
 
         The generator will sleep between each message by
@@ -419,23 +1041,75 @@ class MidiFile:
         MIDI events. To use a different clock (e.g. to synchronize to
         an audio stream), pass now=time_fn where time_fn is a zero
         argument function that yields the current time in seconds.
+
+        Pass start=seconds to start playback somewhere inside the
+        file. The returned Playback object also has a seek() method
+        for jumping to another position during playback. In both
+        cases you first get messages that restore the program,
+        controller and pitchwheel state of each channel.
+
+        Pass lookahead=seconds for more precise timing. Playback will
+        then sleep until that long before each message is due and
+        spin-wait for the rest. See Playback for details.
+
+        To replace both the clock and the sleeping, pass a clock
+        object. With clock=VirtualClock() you get the same messages
+        without any waiting, which is useful for offline rendering.
         """
-        start_time = now()
-        input_time = 0.0
+        return Playback(self.schedule(),
+                        meta_messages=meta_messages,
+                        now=now,
+                        start=start,
+                        lookahead=lookahead,
+                        clock=clock)
 
-        for msg in self:
-            input_time += msg.time
+    async def aplay(self, meta_messages=False, now=time.time, start=0.0,
+                    clock=None):
+        """Play back all tracks in an asyncio event loop.
 
-            playback_time = now() - start_time
-            duration_to_next_event = input_time - playback_time
+        This is an async generator that works like play() but waits
+        with asyncio.sleep(), so many files can be played at the same
+        time in one event loop::
 
-            if duration_to_next_event > 0.0:
-                time.sleep(duration_to_next_event)
+            async for msg in mid.aplay():
+                await port.asend(msg)
 
-            if isinstance(msg, MetaMessage) and not meta_messages:
-                continue
-            else:
-                yield msg
+        The arguments are the same as for play().
+        """
+        playback = Playback(self.schedule(),
+                            meta_messages=meta_messages,
+                            now=now,
+                            start=start,
+                            clock=clock)
+        async for msg in playback:
+            yield msg
+
+    def to_arrays(self):
+        """Return the tracks as NumPy structured arrays.
+
+        Returns a list with one (array, messages) pair per track. See
+        mido.midifiles.arrays for a description of the columns.
+
+        Requires NumPy.
+        """
+        from .arrays import track_to_array
+
+        return [track_to_array(track) for track in self.tracks]
+
+    @classmethod
+    def from_arrays(cls, arrays, **kwargs):
+        """Create a MidiFile from arrays returned by to_arrays().
+
+        Keyword arguments are passed on to MidiFile(), so you will
+        typically want to pass ticks_per_beat and type.
+
+        Requires NumPy.
+        """
+        from .arrays import array_to_track
+
+        tracks = [array_to_track(array, messages)
+                  for array, messages in arrays]
+        return cls(tracks=tracks, **kwargs)
 
     def save(self, filename=None, file=None):
         """Save to a file.
@@ -451,6 +1125,14 @@ class MidiFile:
         if self.type == 0 and len(self.tracks) != 1:
             raise ValueError('type 0 file must have exactly 1 track')
 
+        # Undecoded tracks of a memory mapped file are views into the
+        # mapping. Copy them out so that saving over the file doesn't
+        # pull the data out from under them.
+        for track in self.tracks:
+            if (track.__class__ is LazyMidiTrack
+                    and isinstance(track._data.obj, mmap.mmap)):
+                track._data = memoryview(bytes(track._data))
+
         if file is not None:
             self._save(file)
         elif filename is not None:
@@ -507,3 +1189,240 @@ class MidiFile:
 
     def __exit__(self, type, value, traceback):
         return False
+
+
+class MidiFileWriter:
+    """Write a MIDI file to disk one message at a time.
+
+    This is for recordings that are too long to keep in memory::
+
+        with MidiFileWriter('recording.mid') as writer:
+            writer.add_track('Piano')
+            for msg in inport:
+                writer.append(msg.copy(time=ticks_since_last))
+
+    Messages are encoded the same way as by MidiFile.save() and
+    written to the current track as they are appended. Every
+    flush_size bytes (or when you call flush()) they are written to
+    the file and the chunk length and track count in the file are
+    updated, so if the program crashes you still have a readable file
+    with everything up to the last flush. close() adds the
+    end_of_track message.
+
+    The file must be seekable.
+    """
+    def __init__(self, filename=None, file=None,
+                 type=1, ticks_per_beat=DEFAULT_TICKS_PER_BEAT,
+                 charset='latin1', flush_size=65536):
+        if type not in range(3):
+            raise ValueError(
+                f'invalid format {type} (must be 0, 1 or 2)')
+
+        self.filename = filename
+        self.type = type
+        self.ticks_per_beat = ticks_per_beat
+        self.charset = charset
+        self.flush_size = flush_size
+        self.num_tracks = 0
+        self.closed = False
+
+        if file is not None:
+            self.file = file
+            self._close_file = False
+        elif filename is not None:
+            self.file = open(filename, 'wb')
+            self._close_file = True
+        else:
+            raise ValueError('requires filename or file')
+
+        # Position of the header chunk and of the length of the
+        # current track chunk.
+        self._header_pos = self.file.tell()
+        self._track_pos = None
+        self._track_length = 0
+        self._data = bytearray()
+        self._running_status_byte = None
+        self._accum = 0
+
+        self._write_header()
+
+    def _write_header(self):
+        header = struct.pack('>hhh', self.type,
+                             self.num_tracks,
+                             self.ticks_per_beat)
+        write_chunk(self.file, b'MThd', header)
+
+    def _patch(self, pos, data):
+        end = self.file.tell()
+        self.file.seek(pos)
+        self.file.write(data)
+        self.file.seek(end)
+
+    def add_track(self, name=None):
+        """Start a new track.
+
+        The messages appended after this go into the new track. The
+        first track is started when the first message is appended if
+        you don't call this.
+        """
+        if self.closed:
+            raise ValueError('add_track() called on closed writer')
+        elif self.type == 0 and self.num_tracks == 1:
+            raise ValueError('type 0 file must have exactly 1 track')
+
+        self._end_track()
+
+        self._track_pos = self.file.tell()
+        self._track_length = 0
+        write_chunk(self.file, b'MTrk', b'')
+        self.num_tracks += 1
+        # The track count is at offset 10 in the header chunk.
+        self._patch(self._header_pos + 10,
+                    struct.pack('>h', self.num_tracks))
+
+        if name is not None:
+            self.append(MetaMessage('track_name', name=name))
+
+    def append(self, msg):
+        """Append a message to the current track.
+
+        msg.time is the delta time in ticks.
+        """
+        if self.closed:
+            raise ValueError('append() called on closed writer')
+        elif self._track_pos is None:
+            self.add_track()
+
+        if msg.is_meta:
+            with meta_charset(self.charset):
+                self._encode(msg)
+        else:
+            self._encode(msg)
+
+        if len(self._data) >= self.flush_size:
+            self.flush()
+
+    def _encode(self, msg):
+        # The delta time is written before the message is encoded, so
+        # if encoding fails it has to be removed again. The running
+        # status and accum are only updated on success.
+        size = len(self._data)
+        try:
+            (self._running_status_byte,
+             self._accum) = _encode_messages(self._data, (msg,),
+                                             self._running_status_byte,
+                                             self._accum)
+        except BaseException:
+            del self._data[size:]
+            raise
+
+    def flush(self):
+        """Write appended messages to the file.
+
+        The chunk length and track count in the file are updated so
+        the file can be read up to this point.
+        """
+        if self._data:
+            self.file.write(self._data)
+            self._track_length += len(self._data)
+            self._data.clear()
+            self._patch(self._track_pos + 4,
+                        struct.pack('>L', self._track_length))
+        self.file.flush()
+
+    def _end_track(self):
+        if self._track_pos is not None:
+            _encode_end_of_track(self._data, self._accum)
+            self.flush()
+            self._running_status_byte = None
+            self._accum = 0
+
+    def close(self):
+        """End the current track and close the file."""
+        if self.closed:
+            return
+
+        if self.type == 0 and self.num_tracks == 0:
+            self.add_track()
+        self._end_track()
+        self.closed = True
+
+        if self._close_file:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+        return False
+
+
+def _load_batch(paths, kwargs):
+    # This runs in a worker process.
+    results = []
+    for path in paths:
+        try:
+            mid = MidiFile(path, **kwargs)
+        except Exception as exc:
+            results.append((path, exc))
+        else:
+            tracks = [_pack_track(track) for track in mid.tracks]
+            header = (mid.type, mid.ticks_per_beat, mid.charset)
+            results.append((path, (header, tracks)))
+    return results
+
+
+def _collect_batches(pending, ordered):
+    if ordered:
+        done = [pending.popleft()]
+    else:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.remove(future)
+
+    for future in done:
+        for path, result in future.result():
+            if isinstance(result, Exception):
+                yield path, result
+            else:
+                (type, ticks_per_beat, charset), tracks = result
+                yield path, MidiFile(path,
+                                     type=type,
+                                     ticks_per_beat=ticks_per_beat,
+                                     charset=charset,
+                                     tracks=[_unpack_track(packed)
+                                             for packed in tracks])
+
+
+def load_many(paths, workers=None, ordered=False, chunksize=16, **kwargs):
+    """Load many MIDI files in a pool of worker processes.
+
+    Generates (path, result) for each path, where result is either a
+    MidiFile or the exception that was raised while loading it. A
+    corrupt file does not stop the other files from being loaded.
+
+    Paths are sent to the workers chunksize at a time. If ordered is
+    False (the default) results are generated as soon as they are
+    ready, otherwise they come in the same order as paths. Any other
+    keyword arguments are passed on to MidiFile().
+
+    paths can be any iterable, including a generator. Only a few
+    chunks are submitted ahead of the results being consumed.
+    """
+    max_pending = 2 * (workers or os.cpu_count() or 1)
+    pending = deque()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        paths = iter(paths)
+        while True:
+            batch = list(islice(paths, chunksize))
+            if not batch:
+                break
+
+            pending.append(executor.submit(_load_batch, batch, kwargs))
+            if len(pending) >= max_pending:
+                yield from _collect_batches(pending, ordered)
+
+        while pending:
+            yield from _collect_batches(pending, ordered)
@@ -0,0 +1,507 @@
+# SPDX-FileCopyrightText: 2026 Mido project
+#
+# SPDX-License-Identifier: MIT
+
+import asyncio
+import time
+from array import array
+from bisect import bisect_left
+from collections import deque
+
+from ..messages import Message
+from ..messages.decode import decode_message
+from ..messages.messages import SysexData, _decoders, _from_msgdict
+from ..messages.specs import MIN_PITCHWHEEL
+
+# Bank select must be sent before program change to have any effect.
+BANK_SELECT = (0, 32)
+
+# Channel mode messages (all sound off, all notes off and so on) are
+# not part of the channel state, except for reset all controllers
+# which clears it.
+CHANNEL_MODE_START = 120
+RESET_ALL_CONTROLLERS = 121
+
+# Number of messages between the chase states saved by Schedule.
+CHASE_INTERVAL = 1024
+
+
+class _ChaseState:
+    """Program, controller and pitchwheel state of all channels."""
+    def __init__(self):
+        self.programs = {}
+        self.controls = {}
+        self.pitches = {}
+
+    def copy(self):
+        state = _ChaseState()
+        state.programs = dict(self.programs)
+        state.controls = {channel: dict(channel_controls)
+                          for channel, channel_controls
+                          in self.controls.items()}
+        state.pitches = dict(self.pitches)
+        return state
+
+    def control_change(self, channel, control, value):
+        channel_controls = self.controls.setdefault(channel, {})
+        if control == RESET_ALL_CONTROLLERS:
+            channel_controls.clear()
+            self.pitches.pop(channel, None)
+        elif control < CHANNEL_MODE_START:
+            # Move the controller to the end so the controllers are
+            # sent in the order they were last changed. This keeps
+            # RPN and NRPN selects ahead of data entry.
+            channel_controls.pop(control, None)
+            channel_controls[control] = value
+
+    def program_change(self, channel, program):
+        self.programs[channel] = program
+
+    def pitchwheel(self, channel, pitch):
+        self.pitches[channel] = pitch
+
+    def messages(self):
+        chase = []
+        for channel in range(16):
+            channel_controls = self.controls.get(channel, {})
+
+            for control in BANK_SELECT:
+                if control in channel_controls:
+                    chase.append(Message('control_change', channel=channel,
+                                         control=control,
+                                         value=channel_controls[control]))
+
+            if channel in self.programs:
+                chase.append(Message('program_change', channel=channel,
+                                     program=self.programs[channel]))
+
+            for control, value in channel_controls.items():
+                if control not in BANK_SELECT:
+                    chase.append(Message('control_change', channel=channel,
+                                         control=control, value=value))
+
+            if channel in self.pitches:
+                chase.append(Message('pitchwheel', channel=channel,
+                                     pitch=self.pitches[channel]))
+
+        return chase
+
+
+def chase_messages(messages):
+    """Return the messages needed to restore the channel state.
+
+    Goes through the messages and returns program_change,
+    control_change and pitchwheel messages that bring a device to the
+    same state as if all the messages had been sent. Only the last
+    value of each controller is kept. The returned messages have
+    time=0.
+    """
+    state = _ChaseState()
+
+    for msg in messages:
+        if msg.type == 'control_change':
+            state.control_change(msg.channel, msg.control, msg.value)
+        elif msg.type == 'program_change':
+            state.program_change(msg.channel, msg.program)
+        elif msg.type == 'pitchwheel':
+            state.pitchwheel(msg.channel, msg.pitch)
+
+    return state.messages()
+
+
+class SystemClock:
+    """The clock used for playback unless you pass another one.
+
+    A clock has a now() method which returns the current time in
+    seconds, sleep() and spin() methods which wait for a number of
+    seconds and an asleep() coroutine which does the same in an
+    asyncio event loop. sleep() may wake up a bit late while spin()
+    busy-waits to be exact.
+
+    now is the function used to read the time.
+    """
+    def __init__(self, now=time.time):
+        self.now = now
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def spin(self, seconds):
+        end = self.now() + seconds
+        while self.now() < end:
+            pass
+
+    async def asleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+
+class VirtualClock:
+    """A clock where time only moves when you sleep.
+
+    Sleeping advances the time right away instead of waiting, so
+    play() will yield the same messages with the same time attributes
+    as with the system clock, only as fast as it can. This is useful
+    for rendering a file offline or in tests::
+
+        clock = VirtualClock()
+        for msg in mid.play(clock=clock):
+            synth.render(msg, at=clock.time)
+
+    The time attribute is the current time in seconds.
+    """
+    def __init__(self, time=0.0):
+        self.time = time
+
+    def now(self):
+        return self.time
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.time += seconds
+
+    spin = sleep
+
+    async def asleep(self, seconds):
+        self.sleep(seconds)
+        # Let other tasks run.
+        await asyncio.sleep(0)
+
+
+class Schedule:
+    """Precomputed playback schedule for a MIDI file.
+
+    This is what MidiFile.schedule() returns. It has everything
+    needed to play the file in a compact form, so it can be played
+    many times without merging the tracks or converting ticks to
+    seconds again.
+
+    times is an array('d') with the time of each message in seconds
+    from the start of the file and deltas is an array('d') with the
+    time since the previous message. The messages are stored encoded
+    as bytes in data, with message number i in
+    data[offsets[i]:offsets[i + 1]]. Meta messages can not be encoded
+    this way, so they are kept as they are in the dictionary meta
+    (indexed by message number) and take up no bytes in data.
+
+    timed is an iterable of (delta seconds, message) as returned by
+    MidiFile.iter_timed().
+    """
+    def __init__(self, timed=()):
+        self.times = array('d')
+        self.deltas = array('d')
+        self.offsets = array('L', [0])
+        self.meta = {}
+
+        data = bytearray()
+        seconds = 0.0
+        for delta, msg in timed:
+            seconds += delta
+            if msg.is_meta:
+                self.meta[len(self.times)] = msg
+            else:
+                data.extend(msg.bytes())
+            self.times.append(seconds)
+            self.deltas.append(delta)
+            self.offsets.append(len(data))
+
+        self.data = bytes(data)
+        self.length = seconds
+        # Chase state at every CHASE_INTERVAL messages.
+        self._chase_states = [_ChaseState()]
+
+    def __len__(self):
+        return len(self.times)
+
+    def is_meta(self, index):
+        """Return True if message number index is a meta message."""
+        return index in self.meta
+
+    def message(self, index, time=0):
+        """Return a new copy of message number index.
+
+        The time attribute of the message is set to time.
+        """
+        if index in self.meta:
+            return self.meta[index].copy(skip_checks=True, time=time)
+
+        data = self.data[self.offsets[index]:self.offsets[index + 1]]
+        decoder = _decoders(Message).get(data[0])
+        if decoder is not None:
+            return decoder(data, time)
+        else:
+            # Sysex. The bytes were encoded from a valid message, so
+            # there is no need to check them again.
+            msgdict = decode_message(data, time=time, check=False)
+            msgdict['data'] = SysexData(msgdict['data'])
+            return _from_msgdict(Message, msgdict)
+
+    def chase(self, index):
+        """Return the chase messages for the position of message index.
+
+        See chase_messages(). The channel state is saved every
+        CHASE_INTERVAL messages the first time it's needed, so only
+        the messages after the closest saved state are gone through.
+        """
+        states = self._chase_states
+        checkpoint = index // CHASE_INTERVAL
+        while len(states) <= checkpoint:
+            state = states[-1].copy()
+            start = (len(states) - 1) * CHASE_INTERVAL
+            self._update_chase(state, start, start + CHASE_INTERVAL)
+            states.append(state)
+
+        state = states[checkpoint].copy()
+        self._update_chase(state, checkpoint * CHASE_INTERVAL, index)
+        return state.messages()
+
+    def _update_chase(self, state, start, end):
+        # Update the state from the encoded messages, without
+        # creating message objects.
+        data = self.data
+        offsets = self.offsets
+        for i in range(start, min(end, len(self.times))):
+            pos = offsets[i]
+            if pos == offsets[i + 1]:
+                # Meta message.
+                continue
+
+            status_byte = data[pos]
+            kind = status_byte & 0xf0
+            if kind == 0xb0:
+                state.control_change(status_byte & 0x0f,
+                                     data[pos + 1], data[pos + 2])
+            elif kind == 0xc0:
+                state.program_change(status_byte & 0x0f, data[pos + 1])
+            elif kind == 0xe0:
+                pitch = data[pos + 1] | ((data[pos + 2] << 7)
+                                         + MIN_PITCHWHEEL)
+                state.pitchwheel(status_byte & 0x0f, pitch)
+
+    def play(self, **kwargs):
+        """Play back the schedule.
+
+        Returns a Playback object. The arguments are the same as for
+        MidiFile.play().
+        """
+        return Playback(self, **kwargs)
+
+
+class Playback:
+    """Seekable playback of a MIDI file.
+
+    This is what MidiFile.play() and Schedule.play() return. Iterate over it to get the
+    messages with correct timing, just like play() always did.
+
+    The absolute time of every message is in the schedule, so
+    seek() can jump straight to any position. After a seek you first
+    get note_off messages for any notes that were sounding and then a
+    chase of the program, controller and pitchwheel state of each
+    channel at the new position, so the music sounds the way it
+    would have if it had been played from the start.
+
+    By default the playback sleeps until each message is due, which
+    is only as precise as the timer of the operating system (often
+    1-10 ms). If you pass lookahead=seconds it will instead sleep
+    until that long before the message is due and then spin-wait for
+    the rest of the time. A lookahead of 0.0005 to 0.002 gives sub
+    millisecond timing at the cost of keeping one CPU core busy
+    during the spin. You will want to pass now=time.perf_counter for
+    this as well since it has a higher resolution than time.time().
+
+    Instead of now you can pass a clock, which is an object that
+    tells the time and does the waiting. See SystemClock and
+    VirtualClock.
+
+    Messages that are due at the same time are released together
+    with a single wait. Use bursts() to get them as one list. The
+    lateness attribute is the number of seconds the last message was
+    released after it was due.
+
+    You can also iterate over the playback with ``async for``. It then
+    waits with asyncio.sleep() so other tasks can run in the
+    meantime. The lookahead is not used for this since spin-waiting
+    would block the event loop.
+    """
+    def __init__(self, schedule, meta_messages=False, now=time.time,
+                 start=0.0, lookahead=None, clock=None):
+        if clock is None:
+            clock = SystemClock(now)
+
+        self.meta_messages = meta_messages
+        self.clock = clock
+        self.lookahead = lookahead
+        self.lateness = 0.0
+
+        self.schedule = schedule
+        self.times = schedule.times
+        self.length = schedule.length
+        self._pending = deque()
+        self._sounding = {}
+        self.seek(start)
+
+    def seek(self, seconds):
+        """Jump to a position in seconds from the start of the file.
+
+        This can be called before playback or at any time during it.
+        The next messages will be note_offs for the notes that are
+        sounding and the chase messages for the new position, and
+        playback then continues from there.
+        """
+        seconds = min(max(seconds, 0.0), self.length)
+        index = bisect_left(self.times, seconds)
+
+        # Drop what is left of the current burst.
+        self._pending.clear()
+
+        for channel, note in self._sounding:
+            self._pending.append(Message('note_off', channel=channel,
+                                         note=note))
+        self._sounding.clear()
+
+        if index > 0:
+            self._pending.extend(self.schedule.chase(index))
+
+        self.position = seconds
+        self._index = index
+        # The first message after a seek is timed from here.
+        self._seek_position = seconds
+        # The clock is started by the first wait, so time spent
+        # between play() and the first message doesn't count.
+        self._start_time = None
+
+    def _duration_to(self, input_time):
+        if self._start_time is None:
+            self._start_time = self.clock.now() - self.position
+        return input_time - (self.clock.now() - self._start_time)
+
+    def _wait(self, input_time):
+        duration_to_next_event = self._duration_to(input_time)
+
+        if self.lookahead is None:
+            if duration_to_next_event > 0.0:
+                self.clock.sleep(duration_to_next_event)
+        else:
+            if duration_to_next_event > self.lookahead:
+                self.clock.sleep(duration_to_next_event - self.lookahead)
+            duration_to_next_event = self._duration_to(input_time)
+            if duration_to_next_event > 0.0:
+                self.clock.spin(duration_to_next_event)
+
+        self.lateness = -self._duration_to(input_time)
+
+    async def _async_wait(self, input_time):
+        # Spin-waiting would block the event loop, so the lookahead
+        # is not used here.
+        duration_to_next_event = self._duration_to(input_time)
+        if duration_to_next_event > 0.0:
+            await self.clock.asleep(duration_to_next_event)
+
+        self.lateness = -self._duration_to(input_time)
+
+    def _next_group(self):
+        # Return the start and end index of the next messages that
+        # have the same time.
+        start = self._index
+        input_time = self.times[start]
+
+        end = start + 1
+        while end < len(self.times) and self.times[end] == input_time:
+            end += 1
+        self._index = end
+
+        return start, end
+
+    def _make_burst(self, start, end):
+        input_time = self.times[start]
+        deltas = self.schedule.deltas
+        meta = self.schedule.meta
+        message = self.schedule.message
+
+        burst = []
+        for i in range(start, end):
+            if i in meta and not self.meta_messages:
+                continue
+
+            if self._seek_position is None:
+                delta = deltas[i]
+            else:
+                delta = input_time - self._seek_position
+                self._seek_position = None
+            # The deltas are stored as floats, but messages that are
+            # due right away have always had time=0.
+            burst.append(message(i, time=delta or 0))
+
+        self.position = input_time
+        return burst
+
+    def _next_burst(self):
+        while self._index < len(self.times):
+            start, end = self._next_group()
+            self._wait(self.times[start])
+            burst = self._make_burst(start, end)
+            if burst:
+                return burst
+
+        return []
+
+    async def _async_next_burst(self):
+        while self._index < len(self.times):
+            start, end = self._next_group()
+            await self._async_wait(self.times[start])
+            burst = self._make_burst(start, end)
+            if burst:
+                return burst
+
+        return []
+
+    def _track_notes(self, msg):
+        if msg.type == 'note_on' and msg.velocity > 0:
+            self._sounding[(msg.channel, msg.note)] = True
+        elif msg.type in ('note_on', 'note_off'):
+            self._sounding.pop((msg.channel, msg.note), None)
+
+    def bursts(self):
+        """Generate lists of messages that are due at the same time.
+
+        This waits once for each list, so you can send all the
+        messages in it right away. The chase messages after a seek
+        come as one list.
+        """
+        while True:
+            if self._pending:
+                burst = list(self._pending)
+                self._pending.clear()
+            else:
+                burst = self._next_burst()
+                if not burst:
+                    return
+
+            for msg in burst:
+                self._track_notes(msg)
+            yield burst
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self._pending:
+            self._pending.extend(self._next_burst())
+            if not self._pending:
+                raise StopIteration
+
+        msg = self._pending.popleft()
+        self._track_notes(msg)
+        return msg
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._pending:
+            self._pending.extend(await self._async_next_burst())
+            if not self._pending:
+                raise StopAsyncIteration
+
+        msg = self._pending.popleft()
+        self._track_notes(msg)
+        return msg
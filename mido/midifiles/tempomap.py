@@ -0,0 +1,100 @@
+# SPDX-FileCopyrightText: 2026 Mido project
+#
+# SPDX-License-Identifier: MIT
+
+from bisect import bisect_right
+
+# The default tempo is 120 BPM.
+# (500000 microseconds per beat (quarter note).)
+DEFAULT_TEMPO = 500000
+DEFAULT_TICKS_PER_BEAT = 480
+
+
+class TempoMap:
+    """Tempo changes of a song, for converting between ticks and seconds.
+
+    tempos is a list of (tick, tempo) for each set_tempo message in
+    playback order, where tick is the absolute time of the message.
+    end_tick is the length of the song in ticks and is used to compute
+    the length in seconds.
+
+    Conversions are done with a binary search over the tempo changes
+    so they take O(log n) time.
+    """
+    def __init__(self, tempos=(), ticks_per_beat=DEFAULT_TICKS_PER_BEAT,
+                 end_tick=0):
+        self.tempos = list(tempos)
+        self.ticks_per_beat = ticks_per_beat
+        self.end_tick = end_tick
+
+        # Each segment starts at a tempo change (with the default
+        # tempo from tick 0) and runs until the next one.
+        self._ticks = [0]
+        self._seconds = [0.0]
+        self._scales = [DEFAULT_TEMPO * 1e-6 / ticks_per_beat]
+
+        for tick, tempo in self.tempos:
+            seconds = self._seconds[-1] + (
+                (tick - self._ticks[-1]) * self._scales[-1])
+            self._ticks.append(tick)
+            self._seconds.append(seconds)
+            self._scales.append(tempo * 1e-6 / ticks_per_beat)
+
+        self.length = self.tick_to_seconds(end_tick)
+
+    @classmethod
+    def from_tracks(cls, tracks, ticks_per_beat=DEFAULT_TICKS_PER_BEAT):
+        """Create a tempo map from the set_tempo messages in tracks.
+
+        The tracks are assumed to be synchronous (type 0 or 1 file).
+        Tempo changes at the same tick are kept in track order, the
+        same way merge_tracks() orders them.
+        """
+        tempos = []
+        end_tick = 0
+
+        for track in tracks:
+            tick = 0
+            for msg in track:
+                tick += msg.time
+                if msg.type == 'set_tempo':
+                    tempos.append((tick, msg.tempo))
+            end_tick = max(end_tick, tick)
+
+        tempos.sort(key=lambda item: item[0])
+
+        return cls(tempos, ticks_per_beat=ticks_per_beat, end_tick=end_tick)
+
+    def _segment(self, items, value):
+        return max(bisect_right(items, value) - 1, 0)
+
+    def tempo_at(self, tick):
+        """Return the tempo in effect at the given tick."""
+        i = self._segment(self._ticks, tick)
+        if i == 0:
+            return DEFAULT_TEMPO
+        else:
+            return self.tempos[i - 1][1]
+
+    def tick_to_seconds(self, tick):
+        """Convert absolute time in ticks to seconds."""
+        i = self._segment(self._ticks, tick)
+        return self._seconds[i] + (tick - self._ticks[i]) * self._scales[i]
+
+    def seconds_to_tick(self, seconds):
+        """Convert absolute time in seconds to ticks.
+
+        The result is a float. Round it if you need an integer tick.
+        """
+        i = self._segment(self._seconds, seconds)
+        if self._scales[i] == 0:
+            # Tempo 0 means time stands still.
+            return float(self._ticks[i])
+        return self._ticks[i] + (seconds - self._seconds[i]) / self._scales[i]
+
+    def __repr__(self):
+        return '{}({!r}, ticks_per_beat={}, end_tick={})'.format(
+            self.__class__.__name__,
+            self.tempos,
+            self.ticks_per_beat,
+            self.end_tick)
@@ -2,10 +2,24 @@
 #
 # SPDX-License-Identifier: MIT
 
+import heapq
+import itertools
+from array import array
+from bisect import bisect_left
+from operator import itemgetter
+
+from ..messages.packed import PackedMessage, _from_packed, pack_message
 from .meta import MetaMessage
 
 
 class MidiTrack(list):
+    # Modifications are tracked so MidiFile can tell when cached
+    # values need to be recomputed. _version counts modifications and
+    # _dirty is the lowest index that has changed since _dirty_since.
+    _version = 0
+    _dirty = None
+    _dirty_since = 0
+
     @property
     def name(self):
         """Name of the track.
@@ -26,9 +40,10 @@ class MidiTrack(list):
     @name.setter
     def name(self, name):
         # Find the first track_name message and modify it.
-        for message in self:
+        for i, message in enumerate(self):
             if message.type == 'track_name':
                 message.name = name
+                self._modified(i)
                 return
         else:
             # No track name found, add one.
@@ -63,22 +78,73 @@ class MidiTrack(list):
             messages = '[\n  {}]'.format(',\n  '.join(repr(m) for m in self))
         return f'{self.__class__.__name__}({messages})'
 
+    def _modified(self, index):
+        self._version += 1
+        if self._dirty is None or index < self._dirty:
+            self._dirty = index
 
-def _to_abstime(messages, skip_checks=False):
-    """Convert messages to absolute time."""
-    now = 0
-    for msg in messages:
-        now += msg.time
-        yield msg.copy(skip_checks=skip_checks, time=now)
+    def _index(self, index):
+        # Return the lowest position affected by index or slice.
+        size = len(self)
+        if isinstance(index, slice):
+            positions = range(*index.indices(size))
+            if positions.step < 0 and positions:
+                return positions[-1]
+            else:
+                return min(positions.start, size)
+        elif index < 0:
+            return max(index + size, 0)
+        else:
+            return min(index, size)
 
+    def __setitem__(self, index, value):
+        self._modified(self._index(index))
+        list.__setitem__(self, index, value)
 
-def _to_reltime(messages, skip_checks=False):
-    """Convert messages to relative time."""
-    now = 0
-    for msg in messages:
-        delta = msg.time - now
-        yield msg.copy(skip_checks=skip_checks, time=delta)
-        now = msg.time
+    def __delitem__(self, index):
+        self._modified(self._index(index))
+        list.__delitem__(self, index)
+
+    def __iadd__(self, other):
+        self._modified(len(self))
+        return list.__iadd__(self, other)
+
+    def __imul__(self, other):
+        self._modified(len(self) if other > 0 else 0)
+        return list.__imul__(self, other)
+
+    def append(self, msg):
+        self._modified(len(self))
+        list.append(self, msg)
+
+    def extend(self, messages):
+        self._modified(len(self))
+        list.extend(self, messages)
+
+    def insert(self, index, msg):
+        self._modified(self._index(index))
+        list.insert(self, index, msg)
+
+    def pop(self, index=-1):
+        self._modified(self._index(index))
+        return list.pop(self, index)
+
+    def remove(self, msg):
+        index = self.index(msg)
+        self._modified(index)
+        list.__delitem__(self, index)
+
+    def clear(self):
+        self._modified(0)
+        list.clear(self)
+
+    def sort(self, *args, **kwargs):
+        self._modified(0)
+        list.sort(self, *args, **kwargs)
+
+    def reverse(self):
+        self._modified(0)
+        list.reverse(self)
 
 
 def fix_end_of_track(messages, skip_checks=False):
@@ -103,7 +169,131 @@ def fix_end_of_track(messages, skip_checks=False):
     yield MetaMessage('end_of_track', time=accum)
 
 
-def merge_tracks(tracks, skip_checks=False):
+class PackedTrack:
+    """A track that stores messages as packed integers.
+
+    Each message takes up two array items: the packed message (see
+    PackedMessage) and the delta time. With typecode 'I' this is 8
+    bytes per message. Use typecode 'L' if you need delta times above
+    2**32 - 1 on platforms where 'I' is 32 bits.
+
+    Meta messages and sysex can't be packed, so they are kept as they
+    are in a dictionary and have 0 in the packed array.
+
+    Indexing and iterating gives PackedMessage objects for packed
+    messages. Only appending is supported. Call to_track() to get a
+    MidiTrack that you can edit. PackedTracks can be used in
+    MidiFile.tracks like any other track.
+    """
+    def __init__(self, messages=(), typecode='I'):
+        if typecode not in ('I', 'L'):
+            raise ValueError("typecode must be 'I' or 'L'")
+
+        self.packed = array(typecode)
+        self.times = array(typecode)
+        # Messages that can't be packed, by index.
+        self.unpacked = {}
+        self.extend(messages)
+
+    @property
+    def name(self):
+        """Name of the track, or '' if there is no track_name message."""
+        for index in sorted(self.unpacked):
+            if self.unpacked[index].type == 'track_name':
+                return self.unpacked[index].name
+        else:
+            return ''
+
+    def append(self, msg):
+        if msg.is_meta or msg.type == 'sysex':
+            packed = 0
+        elif isinstance(msg, PackedMessage):
+            packed = msg.packed
+        else:
+            packed = pack_message(msg)
+
+        try:
+            self.times.append(msg.time)
+        except (TypeError, OverflowError) as exc:
+            raise ValueError(
+                'message time must be a non-negative int') from exc
+
+        if not packed:
+            self.unpacked[len(self.packed)] = msg
+        self.packed.append(packed)
+
+    def extend(self, messages):
+        for msg in messages:
+            self.append(msg)
+
+    def __len__(self):
+        return len(self.packed)
+
+    def _get(self, index):
+        packed = self.packed[index]
+        if packed:
+            return _from_packed(packed, self.times[index])
+        else:
+            return self.unpacked[index]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return MidiTrack(self._get(i)
+                             for i in range(*index.indices(len(self))))
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('track index out of range')
+        return self._get(index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._get(i)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def to_track(self):
+        """Return a MidiTrack with normal messages."""
+        return MidiTrack(msg.unpack() if isinstance(msg, PackedMessage)
+                         else msg
+                         for msg in self)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(<{len(self)} messages>)'
+
+
+def _iter_abstime(messages):
+    """Generate (absolute time, message) without copying messages."""
+    now = 0
+    for msg in messages:
+        now += msg.time
+        yield now, msg
+
+
+def _merge_tracks(tracks, skip_checks=False):
+    # The tracks are already sorted by time, so a k-way merge does the
+    # job. Messages with the same time come out in track order.
+    merged = heapq.merge(*[_iter_abstime(track) for track in tracks],
+                         key=itemgetter(0))
+
+    # Time of the previous message and of the last message seen,
+    # including end_of_track messages.
+    now = 0
+    end = 0
+
+    for end, msg in merged:
+        # Remove end_of_track messages. Their delta time is added to
+        # the next message, the same way fix_end_of_track() does it.
+        if msg.type != 'end_of_track':
+            yield msg.copy(skip_checks=skip_checks, time=end - now)
+            now = end
+
+    yield MetaMessage('end_of_track', time=end - now)
+
+
+def merge_tracks(tracks, skip_checks=False, lazy=False):
     """Returns a MidiTrack object with all messages from all tracks.
 
     The messages are returned in playback order with delta times
@@ -112,16 +302,144 @@ def merge_tracks(tracks, skip_checks=False):
     Pass skip_checks=True to skip validation of messages before merging.
     This should ONLY be used when the messages in tracks have already
     been validated by mido.checks.
+
+    Pass lazy=True to get an iterator instead of a MidiTrack. The
+    messages are then merged as you go, which avoids holding the whole
+    merged track in memory.
+    """
+    messages = _merge_tracks(tracks, skip_checks=skip_checks)
+
+    if lazy:
+        return messages
+    else:
+        return MidiTrack(messages)
+
+
+def _tail(messages, start):
+    # Messages from start on, without making a MidiTrack copy. Only
+    # plain lists and MidiTracks can be sliced through the list
+    # directly. Subclasses like LazyMidiTrack may not have filled in
+    # the list yet, so they are read through their own iteration.
+    if messages.__class__ is list or messages.__class__ is MidiTrack:
+        return list.__getitem__(messages, slice(start, None))
+    else:
+        return itertools.islice(iter(messages), start, None)
+
+
+def _abstimes(messages, start=0, now=0):
+    times = []
+    for msg in _tail(messages, start):
+        now += msg.time
+        times.append(now)
+    return times
+
+
+class MergedTrack:
+    """A merged track that is kept up to date as the tracks change.
+
+    Each call to update() checks which tracks have been modified
+    since the last call and re-merges from the earliest point in time
+    that was affected. Everything before that is kept as it is.
+
+    This relies on the change tracking in MidiTrack. Other track types
+    are re-merged from the start whenever their length changes.
     """
-    messages = []
-    for track in tracks:
-        messages.extend(_to_abstime(track, skip_checks=skip_checks))
-
-    messages.sort(key=lambda msg: msg.time)
-
-    return MidiTrack(
-        fix_end_of_track(
-            _to_reltime(messages, skip_checks=skip_checks),
-            skip_checks=skip_checks,
-        )
-    )
+    def __init__(self, skip_checks=False):
+        self.skip_checks = skip_checks
+        self.track = None
+        # The tracks and their state from the last update.
+        self._sources = []
+        # Absolute time of each message in each source track.
+        self._abstimes = []
+        # Absolute time of each message in the merged track (not
+        # including the final end_of_track).
+        self._times = []
+
+    def _dirty_index(self, i, track):
+        old_track, version, length = self._sources[i]
+
+        if track is not old_track:
+            return 0
+        elif isinstance(track, MidiTrack):
+            if track._version == version:
+                return None
+            elif track._dirty_since == version and track._dirty is not None:
+                return min(track._dirty, length)
+            else:
+                return 0
+        elif len(track) != length:
+            return 0
+        else:
+            return None
+
+    def update(self, tracks):
+        """Bring the merged track up to date and return it."""
+        if self.track is None or len(tracks) != len(self._sources):
+            dirty = [0] * len(tracks)
+        else:
+            dirty = [self._dirty_index(i, track)
+                     for i, track in enumerate(tracks)]
+
+        if self.track is not None and all(d is None for d in dirty):
+            return self.track
+
+        # Messages before this time are not affected by the changes.
+        cut = min((0 if d == 0 else self._abstimes[i][d - 1]
+                   for i, d in enumerate(dirty) if d is not None),
+                  default=0)
+
+        for i, (track, d) in enumerate(zip(tracks, dirty)):
+            if d is None:
+                continue
+            elif d == 0:
+                times = _abstimes(track)
+                if i < len(self._abstimes):
+                    self._abstimes[i] = times
+                else:
+                    self._abstimes.append(times)
+            else:
+                times = self._abstimes[i]
+                del times[d:]
+                times += _abstimes(track, d, times[-1])
+
+            if isinstance(track, MidiTrack):
+                track._dirty = None
+                track._dirty_since = track._version
+
+        del self._abstimes[len(tracks):]
+        self._sources = [(track, getattr(track, '_version', None), len(track))
+                         for track in tracks]
+
+        if cut == 0 or self.track is None:
+            self.track = MidiTrack()
+            self._times = []
+        else:
+            keep = bisect_left(self._times, cut)
+            list.__delitem__(self.track, slice(keep, None))
+            del self._times[keep:]
+
+        self._merge_from(tracks, cut)
+        return self.track
+
+    def _merge_from(self, tracks, cut):
+        iterators = []
+        for track, times in zip(tracks, self._abstimes):
+            start = bisect_left(times, cut)
+            iterators.append(zip(times[start:], _tail(track, start)))
+
+        merged = heapq.merge(*iterators, key=itemgetter(0))
+
+        now = self._times[-1] if self._times else 0
+        messages = []
+        for tick, msg in merged:
+            # Leave out end_of_track messages like merge_tracks() does.
+            if msg.type != 'end_of_track':
+                messages.append(msg.copy(skip_checks=self.skip_checks,
+                                         time=tick - now))
+                self._times.append(tick)
+                now = tick
+
+        end = max((times[-1] for times in self._abstimes if times),
+                  default=0)
+        messages.append(MetaMessage('end_of_track', time=end - now))
+        list.extend(self.track, messages)
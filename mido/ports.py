@@ -288,6 +288,15 @@ class BaseOutput(BasePort):
         with self._lock:
             self._send(msg.copy())
 
+    async def asend(self, msg):
+        """Send a message on the port from a coroutine.
+
+        This is the same as send(). The built in MIDI backends don't
+        wait for the message to go out, so it won't hold up the event
+        loop. Override this in ports that can block on send().
+        """
+        self.send(msg)
+
     def reset(self):
         """Send "All Notes Off" and "Reset All Controllers" on all channels"""
         if self.closed:
@@ -35,6 +35,12 @@ def parse_args():
         default=False,
         help='Print messages as they are played back')
 
+    arg('-l', '--loop',
+        dest='loop',
+        action='store_true',
+        default=False,
+        help='Play the files over and over')
+
     arg('-q', '--quiet',
         dest='quiet',
         action='store_true',
@@ -49,9 +55,7 @@ def parse_args():
     return parser.parse_args()
 
 
-def play_file(output, filename, print_messages):
-    midi_file = MidiFile(filename)
-
+def play_file(output, midi_file, print_messages):
     print(f'Playing {midi_file.filename}.')
     length = midi_file.length
     print('Song length: {} minutes, {} seconds.'.format(
@@ -88,8 +92,20 @@ def main():
             print(f'Using output {output.name!r}.')
             output.reset()
             try:
-                for filename in args.files:
-                    play_file(output, filename, args.print_messages)
+                # When looping the files are kept so they don't have
+                # to be loaded and scheduled again.
+                midi_files = {}
+                while True:
+                    for filename in args.files:
+                        if filename in midi_files:
+                            midi_file = midi_files[filename]
+                        else:
+                            midi_file = MidiFile(filename)
+                            if args.loop:
+                                midi_files[filename] = midi_file
+                        play_file(output, midi_file, args.print_messages)
+                    if not args.loop:
+                        break
             finally:
                 print()
                 output.reset()
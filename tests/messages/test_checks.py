@@ -2,9 +2,11 @@
 #
 # SPDX-License-Identifier: MIT
 
+from fractions import Fraction
+
 from pytest import raises
 
-from mido.messages.checks import check_time
+from mido.messages.checks import check_time, make_msgdict_check, make_value_check
 
 
 def test_check_time():
@@ -22,3 +24,44 @@ def test_check_time():
 
     with raises(TypeError):
         check_time('abc')
+
+
+def test_msgdict_check():
+    check = make_msgdict_check('note_on')
+    check({'type': 'note_on', 'time': 0, 'channel': 0, 'note': 60,
+           'velocity': 64})
+    # Integral and Real values other than int and float.
+    check({'type': 'note_on', 'time': Fraction(1, 2), 'channel': True,
+           'note': 60, 'velocity': True})
+
+    with raises(ValueError):
+        check({'type': 'note_on', 'time': 0, 'channel': 0, 'note': 128,
+               'velocity': 64})
+
+    with raises(TypeError):
+        check({'type': 'note_on', 'time': 0, 'channel': 0, 'note': 60.0,
+               'velocity': 64})
+
+    with raises(ValueError):
+        check({'type': 'note_on', 'time': 0, 'channel': 0, 'note': 60,
+               'velocity': 64, 'pitch': 0})
+
+
+def test_msgdict_check_sysex():
+    check = make_msgdict_check('sysex')
+    check({'type': 'sysex', 'time': 0, 'data': (1, 2, 3)})
+
+    with raises(ValueError):
+        check({'type': 'sysex', 'time': 0, 'data': (1, 128)})
+
+
+def test_value_check():
+    check = make_value_check('pitch')
+    check(-8192)
+    check(True)
+
+    with raises(ValueError):
+        check(8192)
+
+    with raises(TypeError):
+        check(1.0)
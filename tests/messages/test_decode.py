@@ -53,3 +53,31 @@ def test_sysex_without_stop_byte():
 
     with raises(ValueError):
         decode_message([0xf0, 0])
+
+
+def test_decoders_match_decode_message():
+    from mido.messages.messages import Message, _decoders
+
+    decoders = _decoders(Message)
+    for status_byte in range(0x80, 0x100):
+        for data in ([], [0], [127, 64], [1, 2, 3], [128, 0]):
+            msg_bytes = [status_byte] + data
+            decoder = decoders.get(status_byte)
+            msg = decoder(msg_bytes, 5) if decoder else None
+            try:
+                expected = decode_message(msg_bytes, time=5)
+            except (ValueError, IndexError):
+                assert msg is None
+            else:
+                # None means the caller falls back to decode_message().
+                if msg is not None:
+                    assert msg._msgdict() == expected
+
+
+def test_decoders_leave_odd_input_to_decode_message():
+    from mido.messages.messages import Message, _decoders
+
+    decoder = _decoders(Message)[0x90]
+    assert decoder([0x90, 60.0, 64], 0) is None
+    assert decoder([0x90, True, 64], 0) is None
+    assert decoder([0x90, -1, 64], 0) is None
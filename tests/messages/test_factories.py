@@ -0,0 +1,57 @@
+# SPDX-FileCopyrightText: 2026 Mido project
+#
+# SPDX-License-Identifier: MIT
+
+from pytest import raises
+
+from mido.messages import factories
+from mido.messages.messages import Message, SysexData
+
+
+def test_factories_match_message():
+    assert factories.note_on(1, 60, 64, time=10) == Message(
+        'note_on', channel=1, note=60, velocity=64, time=10)
+    assert factories.note_off(0, 60, 0) == Message('note_off', velocity=0,
+                                                   note=60)
+    assert factories.polytouch(2, 60, 3) == Message(
+        'polytouch', channel=2, note=60, value=3)
+    assert factories.control_change(15, 7, 127) == Message(
+        'control_change', channel=15, control=7, value=127)
+    assert factories.program_change(0, 5) == Message('program_change',
+                                                     program=5)
+    assert factories.aftertouch(0, 5) == Message('aftertouch', value=5)
+    assert factories.pitchwheel(0, -8192) == Message('pitchwheel',
+                                                     pitch=-8192)
+    assert factories.quarter_frame(7, 15) == Message(
+        'quarter_frame', frame_type=7, frame_value=15)
+    assert factories.songpos(16383) == Message('songpos', pos=16383)
+    assert factories.song_select(3) == Message('song_select', song=3)
+
+
+def test_factory_sysex():
+    msg = factories.sysex([1, 2, 3], time=1)
+    assert isinstance(msg.data, SysexData)
+    assert msg == Message('sysex', data=(1, 2, 3), time=1)
+
+    with raises(ValueError):
+        factories.sysex([128])
+
+
+def test_factory_checks():
+    with raises(ValueError):
+        factories.note_on(16, 60, 64)
+
+    with raises(ValueError):
+        factories.control_change(0, 128, 0)
+
+    with raises(TypeError):
+        factories.note_on(0, 60.0, 64)
+
+    with raises(TypeError):
+        factories.note_on(0, 60, 64, time=None)
+
+    with raises(ValueError):
+        factories.pitchwheel(0, 8192)
+
+    # Other Integral values are accepted like in Message().
+    assert factories.note_on(True, 60, 64).channel is True
@@ -2,6 +2,8 @@
 #
 # SPDX-License-Identifier: MIT
 
+import pickle
+
 from pytest import raises
 
 from mido.messages.messages import Message, SysexData
@@ -58,6 +60,17 @@ def test_copy():
     assert Message('start').copy(time=1) == Message('start', time=1)
 
 
+def test_copy_time():
+    msg = Message('note_on', channel=2, note=60, time=1)
+    assert msg.copy(time=5) == Message('note_on', channel=2, note=60, time=5)
+    assert msg.time == 1
+
+    with raises(TypeError):
+        msg.copy(time=None)
+
+    assert msg.copy(skip_checks=True, time=None).time is None
+
+
 def test_init_invalid_argument():
     with raises(ValueError):
         Message('note_on', zzzzzzzzzzzz=2)
@@ -119,3 +132,30 @@ def test_repr():
     msg = Message('note_on', channel=1, note=2, time=3)
     msg_eval = eval(repr(msg))  # noqa: S307
     assert msg == msg_eval
+
+
+def test_slots():
+    msg = Message('note_on')
+    # The attributes are stored in slots instead of a __dict__.
+    assert not hasattr(msg, '__dict__')
+    assert msg.__class__ is Message('note_on', note=1).__class__
+    assert msg.__class__ is not Message('note_off').__class__
+
+    with raises(AttributeError):
+        msg.value = 1
+
+
+def test_pickle():
+    msg = Message('sysex', data=[1, 2], time=3)
+    assert pickle.loads(pickle.dumps(msg)) == msg  # noqa: S301
+
+
+def test_from_bytes_subclass():
+    from mido.frozen import FrozenMessage
+
+    msg = FrozenMessage.from_bytes(b'\x91\x3c\x40', time=2)
+    assert isinstance(msg, FrozenMessage)
+    assert msg == Message('note_on', channel=1, note=60, velocity=64, time=2)
+
+    with raises(ValueError):
+        Message.from_bytes([0x90, 128, 0])
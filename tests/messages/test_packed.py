@@ -0,0 +1,77 @@
+# SPDX-FileCopyrightText: 2026 Mido project
+#
+# SPDX-License-Identifier: MIT
+
+from pytest import raises
+
+from mido.messages.messages import Message
+from mido.messages.packed import PackedMessage, pack_message
+from mido.messages.specs import SPECS
+from mido.midifiles.meta import MetaMessage
+
+
+def test_pack_message():
+    assert pack_message(Message('note_on', channel=1, note=60,
+                                velocity=100)) == 0x643c91
+
+
+def test_packed_attributes():
+    msg = PackedMessage(0x643c91, time=10)
+    assert msg.type == 'note_on'
+    assert msg.channel == 1
+    assert msg.note == 60
+    assert msg.velocity == 100
+    assert msg.time == 10
+    assert msg == Message('note_on', channel=1, note=60, velocity=100,
+                          time=10)
+
+    with raises(AttributeError):
+        msg.pitch  # noqa: B018
+
+    with raises(AttributeError):
+        msg.note = 61
+
+
+def test_pack_unpack_all_types():
+    for spec in SPECS:
+        if spec.type == 'sysex':
+            continue
+
+        kwargs = {name: 3 for name in spec.value_names}
+        if 'pitch' in kwargs:
+            kwargs['pitch'] = -1000
+        if 'pos' in kwargs:
+            kwargs['pos'] = 10000
+        msg = Message(spec.type, time=5, **kwargs)
+
+        packed = PackedMessage.from_message(msg)
+        assert packed.bytes() == msg.bytes()
+        assert str(packed) == str(msg)
+        assert packed.unpack() == msg
+        assert packed == msg
+
+
+def test_packed_copy():
+    msg = PackedMessage.from_message(Message('control_change', value=7))
+    assert msg.copy(time=3).time == 3
+    assert msg.copy(value=8, channel=2).packed == 0x0800b2
+
+    with raises(ValueError):
+        msg.copy(value=128)
+
+
+def test_invalid_packed_message():
+    with raises(ValueError):
+        PackedMessage(0xf0)  # sysex
+    with raises(ValueError):
+        PackedMessage(0x803c90)  # data byte > 127
+    with raises(ValueError):
+        PackedMessage(0x0100c0)  # extra byte for program_change
+    with raises(ValueError):
+        PackedMessage.from_message(MetaMessage('end_of_track'))
+
+
+def test_packed_repr():
+    msg = PackedMessage(0x643c91, time=10)
+    assert repr(msg) == 'PackedMessage(0x643c91, time=10)'
+    assert eval(repr(msg)) == msg  # noqa: S307
@@ -0,0 +1,61 @@
+# SPDX-FileCopyrightText: 2026 Mido project
+#
+# SPDX-License-Identifier: MIT
+
+import io
+
+import pytest
+
+from mido.messages import Message
+from mido.midifiles.meta import MetaMessage
+from mido.midifiles.midifiles import MidiFile, MidiTrack
+
+np = pytest.importorskip('numpy')
+from mido.midifiles.arrays import TYPE_CODES  # noqa: E402
+
+
+def make_file():
+    return MidiFile(ticks_per_beat=96, tracks=[
+        MidiTrack([
+            MetaMessage('track_name', name='Test'),
+            Message('program_change', channel=9, program=3),
+            Message('note_on', channel=9, note=60, velocity=100, time=10),
+            Message('pitchwheel', channel=9, pitch=-300, time=5),
+            Message('sysex', data=[1, 2, 3], time=0),
+            Message('note_off', channel=9, note=60, velocity=0, time=20),
+        ]),
+    ])
+
+
+def test_to_arrays():
+    [(array, messages)] = make_file().to_arrays()
+
+    assert list(array['tick']) == [0, 0, 10, 15, 15, 35]
+    assert list(array['type']) == [TYPE_CODES[name] for name in [
+        'meta', 'program_change', 'note_on', 'pitchwheel', 'sysex', 'note_off']]
+    assert list(array['channel']) == [-1, 9, 9, 9, -1, 9]
+    assert list(array['note']) == [0, 3, 60, 0, 0, 60]
+    assert list(array['pitch']) == [0, 0, 0, -300, 0, 0]
+    assert list(array['meta']) == [0, -1, -1, -1, 1, -1]
+    assert messages[0].name == 'Test'
+    assert messages[1].data == (1, 2, 3)
+
+
+def test_from_arrays():
+    mid = make_file()
+    assert MidiFile.from_arrays(mid.to_arrays()).tracks == mid.tracks
+
+
+def test_transpose_and_save():
+    mid = make_file()
+    [(array, messages)] = mid.to_arrays()
+    notes = np.isin(array['type'], [TYPE_CODES['note_on'],
+                                    TYPE_CODES['note_off']])
+    array['note'][notes] += 12
+    # Drop the pitchwheel message.
+    array = array[array['type'] != TYPE_CODES['pitchwheel']]
+
+    new = MidiFile.from_arrays([(array, messages)], ticks_per_beat=96)
+    new.save(file=io.BytesIO())
+    assert [msg.note for msg in new.tracks[0] if msg.type == 'note_on'] == [72]
+    assert new.tracks[0][3] == Message('sysex', data=[1, 2, 3], time=5)
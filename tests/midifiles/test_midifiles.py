@@ -2,13 +2,32 @@
 #
 # SPDX-License-Identifier: MIT
 
+import asyncio
 import io
+import itertools
 
-from pytest import raises
+from pytest import approx, raises
 
 from mido.messages import Message
-from mido.midifiles.meta import KeySignatureError, MetaMessage
-from mido.midifiles.midifiles import MidiFile, MidiTrack
+from mido.midifiles import playback
+from mido.midifiles.meta import (
+    KeySignatureError,
+    MetaMessage,
+    UnknownMetaMessage,
+)
+from mido.midifiles.midifiles import (
+    LazyMidiTrack,
+    MidiFile,
+    MidiFileWriter,
+    MidiTrack,
+    decode_tracks_parallel,
+    encode_track,
+    iter_events,
+    load_many,
+    probe,
+)
+from mido.midifiles.playback import VirtualClock, chase_messages
+from mido.midifiles.tracks import merge_tracks
 
 HEADER_ONE_TRACK = """
 4d 54 68 64  # MThd
@@ -185,3 +204,619 @@ def test_midifile_repr():
     for track, track_eval in zip(midifile.tracks, midifile_eval.tracks):
         for m1, m2 in zip(track, track_eval):
             assert m1 == m2
+
+
+def test_running_status():
+    assert read_file(HEADER_ONE_TRACK + """
+    4d 54 72 6b  # MTrk
+    00 00 00 07
+    00 90 40 40  # note_on
+    10 41 40     # note_on with running status
+    """).tracks[0] == [Message('note_on', note=64, velocity=64, time=0),
+                       Message('note_on', note=65, velocity=64, time=16)]
+
+
+def test_message_past_end_of_track():
+    with raises(IOError):
+        read_file(HEADER_ONE_TRACK + """
+        4d 54 72 6b  # MTrk
+        00 00 00 03
+        00 90 40 40  # note_on (one byte outside the chunk)
+        """)
+
+
+def test_sysex_data_byte_out_of_range():
+    data = HEADER_ONE_TRACK + """
+    4d 54 72 6b  # MTrk
+    00 00 00 05
+    00 f0 02 80 f7  # sysex with data byte 0x80
+    """
+    with raises(ValueError):
+        read_file(data)
+
+    assert read_file(data, clip=True).tracks[0] == [
+        Message('sysex', data=[127])]
+
+
+def test_mmap(tmpdir):
+    path = tmpdir.join('test.mid').strpath
+    with open(path, 'wb') as outfile:
+        outfile.write(parse_hexdump("""
+        4d54 6864 0000 0006 0001 0002 0040        # Header
+        4d54 726b 0000 0008 00 90 40 10  40 80 40 10   # Track 0
+        4d54 726b 0000 000a 00 f0 03 01 02 f7  00 ff 2f 00  # Track 1
+        """))
+
+    mid = MidiFile(path, mmap=True)
+    assert mid.tracks == MidiFile(path).tracks
+    assert mid.tracks[1][0] == Message('sysex', data=[1, 2])
+
+
+def test_lazy():
+    data = parse_hexdump(HEADER_ONE_TRACK + """
+    4d 54 72 6b  # MTrk
+    00 00 00 10  # Chunk size
+    00 ff 03 04 54 65 73 74  # track_name name='Test'
+    00 90 40 40  # note_on
+    00 ff 2f 00  # end_of_track
+    """)
+    mid = MidiFile(file=io.BytesIO(data), lazy=True)
+    track = mid.tracks[0]
+    assert isinstance(track, LazyMidiTrack)
+
+    # Looking up the name does not decode the track.
+    assert track.name == 'Test'
+    assert isinstance(track, LazyMidiTrack)
+
+    assert len(track) == 3
+    assert type(track) is MidiTrack
+    assert track == MidiFile(file=io.BytesIO(data)).tracks[0]
+
+
+def test_lazy_iterate():
+    data = parse_hexdump(HEADER_ONE_TRACK + """
+    4d 54 72 6b  # MTrk
+    00 00 00 10  # Chunk size
+    00 ff 03 04 54 65 73 74  # track_name name='Test'
+    00 90 40 40  # note_on
+    00 ff 2f 00  # end_of_track
+    """)
+    expected = list(MidiFile(file=io.BytesIO(data)))
+
+    # The tracks are decoded when they are merged.
+    assert list(MidiFile(file=io.BytesIO(data), lazy=True)) == expected
+
+    mid = MidiFile(file=io.BytesIO(data), lazy=True)
+    assert len(mid.merged_track) == 3
+    assert list(mid) == expected
+
+
+def test_lazy_add():
+    data = parse_hexdump(HEADER_ONE_TRACK + """
+    4d 54 72 6b  # MTrk
+    00 00 00 08  # Chunk size
+    00 90 40 40  # note_on
+    00 ff 2f 00  # end_of_track
+    """)
+    expected = MidiFile(file=io.BytesIO(data)).tracks[0]
+
+    def lazy_track():
+        return MidiFile(file=io.BytesIO(data), lazy=True).tracks[0]
+
+    assert lazy_track() + lazy_track() == expected + expected
+    assert [] + lazy_track() == expected
+    assert MidiTrack() + lazy_track() == expected
+
+
+def test_workers():
+    data = parse_hexdump("""
+    4d54 6864 0000 0006 0001 0002 0040        # Header
+    4d54 726b 0000 000c 00 ff 03 01 41  00 90 40 10  40 40 00  # Track 0
+    4d54 726b 0000 0008 00 90 47 10  40 80 47 10   # Track 1
+    """)
+    mid = MidiFile(file=io.BytesIO(data), workers=2)
+    assert mid.tracks == MidiFile(file=io.BytesIO(data)).tracks
+    assert all(type(track) is MidiTrack for track in mid.tracks)
+
+
+def test_decode_tracks_parallel():
+    track = MidiTrack([
+        MetaMessage('track_name', name='Test'),
+        Message('note_on', channel=1, note=60, velocity=64, time=10),
+        Message('pitchwheel', pitch=-100),
+        Message('sysex', data=[1, 2, 3]),
+        UnknownMetaMessage(type_byte=0x70, data=[4, 5]),
+        Message('note_on', note=61, velocity=64, time=20),
+        MetaMessage('end_of_track'),
+    ])
+    tracks = decode_tracks_parallel([encode_track(track)] * 2, workers=2)
+    assert tracks == [track, track]
+    assert type(tracks[0][4]) is UnknownMetaMessage
+
+
+def test_load_many(tmpdir):
+    good = tmpdir.join('good.mid').strpath
+    bad = tmpdir.join('bad.mid').strpath
+    with open(good, 'wb') as outfile:
+        outfile.write(parse_hexdump(HEADER_ONE_TRACK + """
+        4d 54 72 6b  # MTrk
+        00 00 00 04
+        20 90 40 40  # note_on
+        """))
+    with open(bad, 'wb') as outfile:
+        outfile.write(parse_hexdump(HEADER_ONE_TRACK))
+
+    results = list(load_many([good, bad], workers=2, ordered=True))
+    assert [path for path, _ in results] == [good, bad]
+    assert results[0][1].tracks == MidiFile(good).tracks
+    assert isinstance(results[1][1], EOFError)
+
+
+def test_iter_events():
+    data = parse_hexdump(HEADER_ONE_TRACK + """
+    4d 54 72 6b  # MTrk
+    00 00 00 11  # Chunk size
+    00 ff 03 01 41  # track_name name='A'
+    10 90 40 40  # note_on
+    10 41 40     # note_on with running status
+    00 f0 02 01 f7  # sysex
+    """)
+    assert list(iter_events(data)) == [
+        (0, 0, 0xff, b'\x03A'),
+        (0, 16, 0x90, b'\x40\x40'),
+        (0, 32, 0x90, b'\x41\x40'),
+        (0, 32, 0xf0, b'\x01\xf7'),
+    ]
+
+
+def test_unknown_meta_message_time():
+    mid = read_file(HEADER_ONE_TRACK + """
+    4d 54 72 6b  # MTrk
+    00 00 00 05  # Chunk size
+    10 ff 60 01 01  # unknown meta message
+    """)
+    assert mid.tracks[0][0] == UnknownMetaMessage(0x60, [1], time=16)
+
+
+def test_probe(tmpdir):
+    path = tmpdir.join('test.mid').strpath
+    mid = MidiFile(ticks_per_beat=100, tracks=[
+        MidiTrack([
+            MetaMessage('track_name', name='Tempo'),
+            MetaMessage('set_tempo', tempo=250000, time=200),
+        ]),
+        MidiTrack([
+            MetaMessage('track_name', name='Notes'),
+            Message('note_on', note=60, time=100),
+            Message('note_off', note=60, time=300),
+        ]),
+    ])
+    mid.save(path)
+
+    info = probe(path)
+    assert info['type'] == 1
+    assert info['ticks_per_beat'] == 100
+    assert [track['name'] for track in info['tracks']] == ['Tempo', 'Notes']
+    assert [track['events'] for track in info['tracks']] == [3, 4]
+    assert [track['ticks'] for track in info['tracks']] == [200, 400]
+    assert info['tracks'][1]['size'] == 22
+    assert info['tempo_map'] == [(200, 250000)]
+    assert info['length'] == approx(mid.length) == 1.5
+
+
+def test_iter_timed():
+    mid = MidiFile(ticks_per_beat=100, tracks=[
+        MidiTrack([
+            MetaMessage('set_tempo', tempo=250000, time=100),
+            Message('note_on', note=60, time=100),
+        ]),
+    ])
+
+    assert [(delta, msg.type) for delta, msg in mid.iter_timed()] == [
+        (approx(0.5), 'set_tempo'),
+        (approx(0.25), 'note_on'),
+        (0, 'end_of_track'),
+    ]
+    assert [now for now, _ in mid.iter_timed(absolute=True)] == [
+        approx(0.5), approx(0.75), approx(0.75)]
+
+    # The messages are not copied.
+    assert all(msg is merged for (_, msg), merged
+               in zip(mid.iter_timed(), mid.merged_track))
+
+
+def test_merged_track_follows_track_changes():
+    mid = MidiFile(tracks=[
+        MidiTrack([Message('note_on', note=1, time=i) for i in range(5)]),
+        MidiTrack([Message('note_on', note=2, time=i) for i in range(5)]),
+    ])
+    merged = mid.merged_track
+    assert merged == merge_tracks(mid.tracks)
+    before = list(merged)
+
+    mid.tracks[0][3] = Message('note_off', note=1, time=1)
+    mid.tracks[1].append(Message('note_off', note=2, time=10))
+    assert mid.merged_track == merge_tracks(mid.tracks)
+
+    # Only the part after the first change is merged again.
+    assert all(a is b for a, b in zip(before[:4], mid.merged_track[:4]))
+    assert before[4] is not mid.merged_track[4]
+
+
+def test_play_start():
+    mid = MidiFile(tracks=[MidiTrack([
+        Message('program_change', channel=1, program=3),
+        Message('control_change', channel=1, control=7, value=90),
+        Message('control_change', channel=1, control=0, value=2),
+        Message('control_change', channel=1, control=7, value=100),
+        Message('pitchwheel', channel=1, pitch=200),
+        Message('note_on', channel=1, note=60, time=480),
+        Message('note_off', channel=1, note=60, time=480),
+    ])])
+    # A clock that runs fast enough that we never have to sleep.
+    clock = itertools.count(0, 1000).__next__
+
+    assert [(msg.type, msg.time) for msg
+            in mid.play(start=0.75, now=clock)] == [
+        ('control_change', 0),
+        ('program_change', 0),
+        ('control_change', 0),
+        ('pitchwheel', 0),
+        ('note_off', approx(0.25)),
+    ]
+
+    chase = list(mid.play(start=0.75, now=clock))[:4]
+    assert [msg.control for msg in chase if msg.type == 'control_change'] \
+        == [0, 7]
+    assert chase[2].value == 100
+    assert chase[3].pitch == 200
+
+
+def test_playback_seek():
+    mid = MidiFile(tracks=[MidiTrack([
+        Message('control_change', control=7, value=90),
+        Message('note_on', note=60, time=480),
+        Message('control_change', control=7, value=100, time=480),
+        Message('note_off', note=60, time=480),
+    ])])
+    clock = itertools.count(0, 1000).__next__
+
+    playback = mid.play(now=clock)
+    assert next(playback).value == 90
+    assert next(playback).type == 'note_on'
+    assert next(playback).value == 100
+
+    # Seeking back releases the sounding note and restores the
+    # controller to its value at the new position.
+    playback.seek(0.6)
+    assert [(msg.type, msg.time) for msg in playback] == [
+        ('note_off', 0),
+        ('control_change', 0),
+        ('control_change', approx(0.4)),
+        ('note_off', approx(0.5)),
+    ]
+
+
+def test_playback_bursts():
+    mid = MidiFile(tracks=[MidiTrack([
+        Message('note_on', note=60),
+        Message('note_on', note=64),
+        Message('note_off', note=60, time=480),
+        Message('note_off', note=64),
+    ])])
+    # A clock that takes 1 ms to read, so the spin-wait ends.
+    clock = itertools.count(0, 0.001).__next__
+
+    playback = mid.play(now=clock, lookahead=10)
+    bursts = []
+    for burst in playback.bursts():
+        bursts.append([msg.type for msg in burst])
+        assert 0 <= playback.lateness < 0.01
+
+    assert bursts == [['note_on', 'note_on'], ['note_off', 'note_off']]
+
+
+def test_aplay():
+    def make_file(note):
+        return MidiFile(tracks=[MidiTrack([
+            Message('note_on', note=note, time=1),
+            Message('note_off', note=note, time=2),
+        ])])
+
+    async def play_files(files):
+        async def play(mid):
+            return [msg async for msg in mid.aplay()]
+        return await asyncio.gather(*[play(mid) for mid in files])
+
+    files = [make_file(60), make_file(64)]
+    assert asyncio.run(play_files(files)) == [list(mid.play())
+                                              for mid in files]
+
+
+def test_play_virtual_clock():
+    # Ten minutes of music.
+    mid = MidiFile(tracks=[MidiTrack([
+        Message('note_on', note=60),
+        Message('note_off', note=60, time=480 * 1200),
+    ])])
+    clock = VirtualClock()
+
+    assert [(msg.type, msg.time, clock.time)
+            for msg in mid.play(clock=clock, lookahead=0.001)] == [
+        ('note_on', 0, 0),
+        ('note_off', approx(600), approx(600)),
+    ]
+
+    clock = VirtualClock()
+    messages = asyncio.run(_collect(mid.aplay(clock=clock)))
+    assert [msg.time for msg in messages] == [0, approx(600)]
+    assert clock.time == approx(600)
+
+
+def test_play_starts_clock_on_first_message():
+    mid = MidiFile(tracks=[MidiTrack([
+        Message('note_on', note=60),
+        Message('note_off', note=60, time=480),
+    ])])
+    clock = VirtualClock()
+
+    playback = mid.play(clock=clock)
+    # Time spent before the first message, for example opening a port.
+    clock.sleep(10)
+    assert [(msg.type, clock.time) for msg in playback] == [
+        ('note_on', 10),
+        ('note_off', approx(10.5)),
+    ]
+    assert playback.lateness == 0
+
+
+def test_play_zero_delta_is_int():
+    mid = MidiFile(tracks=[MidiTrack([
+        Message('note_on', note=60),
+        Message('note_on', note=64),
+        Message('note_off', note=60, time=480),
+    ])])
+    times = [msg.time for msg in mid.play(clock=VirtualClock())]
+    assert times == [0, 0, 0.5]
+    assert [type(time) for time in times] == [int, int, float]
+
+
+def test_play_seek_skipped_meta():
+    mid = MidiFile(tracks=[MidiTrack([
+        Message('note_on', note=60),
+        MetaMessage('text', text='Chorus', time=480),
+        Message('note_off', note=60),
+    ])])
+    clock = VirtualClock()
+
+    # The time from the seek position goes to the first message that
+    # is played, not to the skipped meta messages.
+    assert [(msg.type, msg.time, clock.time)
+            for msg in mid.play(start=0.4, clock=clock)] == [
+        ('note_off', approx(0.1), approx(0.1)),
+    ]
+
+
+async def _collect(messages):
+    return [msg async for msg in messages]
+
+
+def test_schedule():
+    mid = MidiFile(tracks=[MidiTrack([
+        Message('program_change', program=3),
+        MetaMessage('set_tempo', tempo=250000, time=480),
+        Message('sysex', data=[1, 2, 3]),
+        Message('note_on', note=60, time=480),
+    ])])
+    schedule = mid.schedule()
+    assert schedule is mid.schedule()
+    assert list(schedule.times) == [0, 0.5, 0.5, 0.75, 0.75]
+    assert len(schedule.data) == 2 + 5 + 3
+    assert schedule.is_meta(1)
+    assert [schedule.message(i, time=1) for i in range(len(schedule))] \
+        == [msg.copy(time=1) for msg in mid.merged_track]
+
+    clock = VirtualClock()
+    assert list(schedule.play(meta_messages=True, clock=clock)) \
+        == list(mid.play(meta_messages=True, clock=clock))
+
+    # A new schedule is made when the tracks change.
+    mid.tracks[0].append(Message('note_off', note=60))
+    assert mid.schedule() is not schedule
+    assert len(mid.schedule()) == len(schedule) + 1
+
+
+def test_schedule_chase(monkeypatch):
+    monkeypatch.setattr(playback, 'CHASE_INTERVAL', 4)
+
+    messages = [
+        Message('control_change', channel=1, control=7, value=100),
+        Message('program_change', channel=1, program=5, time=10),
+        MetaMessage('set_tempo', tempo=400000),
+        Message('pitchwheel', channel=2, pitch=-100, time=10),
+        Message('control_change', channel=1, control=0, value=1),
+        Message('note_on', channel=1, note=60, time=10),
+        Message('control_change', channel=1, control=121, time=10),
+        Message('control_change', channel=1, control=7, value=90),
+        Message('program_change', channel=1, program=6, time=10),
+        Message('note_off', channel=1, note=60, time=10),
+    ]
+    schedule = MidiFile(tracks=[MidiTrack(messages)]).schedule()
+
+    # Go backwards so the later states are saved first.
+    for index in reversed(range(len(messages) + 1)):
+        assert schedule.chase(index) == chase_messages(messages[:index])
+
+
+def test_encode_track():
+    track = MidiTrack([
+        Message('note_on', note=64, velocity=64, time=0),
+        MetaMessage('end_of_track', time=10),
+        Message('note_on', note=65, velocity=64, time=6),
+        Message('pitchwheel', pitch=0, time=200),
+        Message('sysex', data=[1]),
+        Message('pitchwheel', pitch=-8192),
+    ])
+    assert encode_track(track) == parse_hexdump("""
+    00 90 40 40  # note_on
+    10 41 40     # note_on with running status (and time from end_of_track)
+    81 48 e0 00 40  # pitchwheel
+    00 f0 02 01 f7  # sysex (clears running status)
+    00 e0 00 00  # pitchwheel
+    00 ff 2f 00  # end_of_track
+    """)
+
+    with raises(ValueError):
+        encode_track([Message('note_on', time=1.5)])
+    with raises(ValueError):
+        encode_track([Message('clock')])
+
+
+def test_midifile_writer():
+    tracks = [
+        MidiTrack([MetaMessage('track_name', name='Piano'),
+                   Message('note_on', note=60, time=10),
+                   MetaMessage('end_of_track', time=5),
+                   Message('note_off', note=60, time=300)]),
+        MidiTrack([MetaMessage('track_name', name='Drums'),
+                   Message('sysex', data=[1, 2, 3])]),
+    ]
+    expected = io.BytesIO()
+    MidiFile(tracks=tracks, ticks_per_beat=96).save(file=expected)
+
+    file = io.BytesIO()
+    with MidiFileWriter(file=file, ticks_per_beat=96) as writer:
+        for track in tracks:
+            writer.add_track(track.name)
+            for msg in track[1:]:
+                writer.append(msg)
+    assert file.getvalue() == expected.getvalue()
+
+    with raises(ValueError):
+        writer.append(Message('note_on'))
+
+
+def test_midifile_writer_flush(tmpdir):
+    filename = tmpdir.join('test.mid').strpath
+    with MidiFileWriter(filename, flush_size=1) as writer:
+        writer.append(Message('note_on', note=60))
+        writer.append(Message('note_off', note=60, time=10))
+
+        # The file can be read before it is closed.
+        assert MidiFile(filename).tracks == [[
+            Message('note_on', note=60),
+            Message('note_off', note=60, time=10)]]
+
+    assert MidiFile(filename).tracks[0][-1].type == 'end_of_track'
+
+
+def test_midifile_writer_rejected_message():
+    file = io.BytesIO()
+    with MidiFileWriter(file=file) as writer:
+        writer.append(Message('note_on', note=60))
+        writer.append(MetaMessage('end_of_track', time=5))
+        with raises(ValueError):
+            writer.append(Message('clock', time=10))
+        writer.append(Message('note_off', note=60, time=20))
+
+    # Nothing of the rejected message was written.
+    file.seek(0)
+    assert MidiFile(file=file).tracks == [[
+        Message('note_on', note=60),
+        Message('note_off', note=60, time=25),
+        MetaMessage('end_of_track')]]
+
+
+def test_lazy_save_without_end_of_track():
+    # The track ends in ff 2f 00, but that is the text of a meta
+    # message, not an end_of_track.
+    data = parse_hexdump(HEADER_ONE_TRACK + """
+    4d 54 72 6b  # MTrk
+    00 00 00 07
+    00 ff 01 03 ff 2f 00  # text
+    """)
+    mid = MidiFile(file=io.BytesIO(data), lazy=True)
+
+    file = io.BytesIO()
+    mid.save(file=file)
+    assert file.getvalue() != data
+
+    file.seek(0)
+    track = MidiFile(file=file).tracks[0]
+    assert [msg.type for msg in track] == ['text', 'end_of_track']
+
+
+def test_length_plain_list_tracks():
+    track = [Message('note_on', time=0), Message('note_off', time=480)]
+    mid = MidiFile(tracks=[track])
+    assert mid.length == 0.5
+
+    # Changes to plain lists can't be detected, so nothing is cached.
+    track[1] = Message('note_off', time=960)
+    assert mid.length == 1
+
+
+def test_lazy_length():
+    data = parse_hexdump(HEADER_ONE_TRACK + """
+    4d 54 72 6b  # MTrk
+    00 00 00 15
+    00 90 40 40  # note_on
+    83 60 ff 51 03 0f 42 40  # set_tempo tempo=1000000 time=480
+    83 60 80 40 40  # note_off time=480
+    00 ff 2f 00  # end_of_track
+    """)
+    mid = MidiFile(file=io.BytesIO(data), lazy=True)
+    assert mid.length == MidiFile(file=io.BytesIO(data)).length == 6
+
+    # The track was not decoded, so it is still saved as it was read.
+    assert isinstance(mid.tracks[0], LazyMidiTrack)
+    file = io.BytesIO()
+    mid.save(file=file)
+    assert file.getvalue() == data
+
+    # The tempo map is updated when the decoded track is changed.
+    mid.tracks[0].insert(2, MetaMessage('set_tempo', tempo=500000))
+    assert mid.length == 4
+
+
+def test_lazy_save_unmodified():
+    data = parse_hexdump(HEADER_ONE_TRACK + """
+    4d 54 72 6b  # MTrk
+    00 00 00 0c
+    00 90 40 40  # note_on
+    00 90 41 40  # note_on (could have used running status)
+    00 ff 2f 00  # end_of_track
+    """)
+    mid = MidiFile(file=io.BytesIO(data), lazy=True)
+    assert mid.tracks[0].name == ''
+
+    # The track is written as it was read.
+    file = io.BytesIO()
+    mid.save(file=file)
+    assert file.getvalue() == data
+
+    # Once the track is decoded it is encoded again.
+    assert len(mid.tracks[0]) == 3
+    file = io.BytesIO()
+    mid.save(file=file)
+    assert len(file.getvalue()) == len(data) - 1
+
+
+def test_lazy_mmap_save_over_file(tmpdir):
+    path = tmpdir.join('test.mid').strpath
+    with open(path, 'wb') as outfile:
+        outfile.write(parse_hexdump("""
+        4d54 6864 0000 0006 0001 0002 0040        # Header
+        4d54 726b 0000 0004 00 ff 2f 00           # Track 0
+        4d54 726b 0000 0008 00 90 40 10  00 ff 2f 00   # Track 1
+        """))
+
+    mid = MidiFile(path, mmap=True, lazy=True)
+    mid.tracks[0].name = 'Test'
+    mid.save(path)
+
+    # The undecoded track was copied out of the mapping before the
+    # file was overwritten.
+    assert mid.tracks[1] == [Message('note_on', note=64, velocity=16),
+                             MetaMessage('end_of_track')]
+    assert MidiFile(path).tracks == mid.tracks
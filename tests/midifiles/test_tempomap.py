@@ -0,0 +1,56 @@
+# SPDX-FileCopyrightText: 2026 Mido project
+#
+# SPDX-License-Identifier: MIT
+
+from pytest import approx, raises
+
+from mido.messages import Message
+from mido.midifiles.meta import MetaMessage
+from mido.midifiles.midifiles import MidiFile
+from mido.midifiles.tempomap import TempoMap
+from mido.midifiles.tracks import MidiTrack
+
+
+def test_conversion():
+    # 0.5 seconds per beat, then 0.25 from tick 200.
+    tempo_map = TempoMap([(200, 250000)], ticks_per_beat=100, end_tick=400)
+
+    assert tempo_map.tick_to_seconds(100) == approx(0.5)
+    assert tempo_map.tick_to_seconds(200) == approx(1.0)
+    assert tempo_map.tick_to_seconds(300) == approx(1.25)
+    assert tempo_map.length == approx(1.5)
+
+    assert tempo_map.seconds_to_tick(0.5) == approx(100)
+    assert tempo_map.seconds_to_tick(1.25) == approx(300)
+
+    assert tempo_map.tempo_at(199) == 500000
+    assert tempo_map.tempo_at(200) == 250000
+
+
+def test_same_tick_tempo_changes():
+    tempo_map = TempoMap([(100, 1000000), (100, 250000)],
+                         ticks_per_beat=100, end_tick=200)
+    assert tempo_map.tempo_at(100) == 250000
+    assert tempo_map.seconds_to_tick(0.75) == approx(200)
+    assert tempo_map.length == approx(0.75)
+
+
+def test_midifile_tempo_map():
+    mid = MidiFile(ticks_per_beat=100, tracks=[
+        MidiTrack([MetaMessage('set_tempo', tempo=250000, time=200)]),
+        MidiTrack([Message('note_on', time=400)]),
+    ])
+    assert mid.tempo_map is mid.tempo_map
+    assert mid.length == approx(1.5) == approx(sum(msg.time for msg in mid))
+
+    # Modifying a track invalidates the tempo map.
+    mid.tracks[1].append(Message('note_off', time=100))
+    assert mid.length == approx(1.75)
+
+    mid.tracks[0][0] = MetaMessage('set_tempo', tempo=500000, time=200)
+    assert mid.length == approx(2.5)
+
+
+def test_type_2_has_no_tempo_map():
+    with raises(TypeError):
+        assert MidiFile(type=2).tempo_map
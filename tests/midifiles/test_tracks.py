@@ -72,3 +72,64 @@ def test_merge_large_midifile():
         sum(msg.time for msg in t) for t in mid.tracks)
     assert merged_duration_ticks == max_track_duration_ticks
     assert (finish - start) < 3.0
+
+
+def test_merge_tracks_lazy():
+    tracks = [
+        MidiTrack([Message('note_on', note=1, time=2),
+                   MetaMessage('end_of_track', time=5)]),
+        MidiTrack([Message('note_on', note=2, time=2),
+                   Message('note_on', note=3, time=1)]),
+    ]
+
+    merged = mido.merge_tracks(tracks, lazy=True)
+    assert not isinstance(merged, list)
+    assert list(merged) == mido.merge_tracks(tracks) == [
+        Message('note_on', note=1, time=2),
+        Message('note_on', note=2, time=0),
+        Message('note_on', note=3, time=1),
+        MetaMessage('end_of_track', time=4),
+    ]
+
+
+def test_track_change_tracking():
+    track = MidiTrack([Message('note_on', time=i) for i in range(10)])
+    assert track._dirty is None
+
+    track.append(Message('note_off'))
+    assert track._dirty == 10
+
+    track[-3] = Message('note_off')
+    assert track._dirty == 8
+
+    del track[5:7]
+    assert track._dirty == 5
+
+    track.insert(-100, Message('note_off'))
+    assert track._dirty == 0
+
+
+def test_packed_track():
+    from mido.messages.packed import PackedMessage
+    from mido.midifiles.tracks import PackedTrack
+
+    messages = [
+        MetaMessage('track_name', name='packed'),
+        Message('note_on', note=60, time=0),
+        Message('sysex', data=[1, 2, 3], time=10),
+        Message('note_off', note=60, time=20),
+    ]
+
+    track = PackedTrack(messages)
+    assert len(track) == 4
+    assert track.name == 'packed'
+    assert track == messages
+    assert isinstance(track[1], PackedMessage)
+    assert track[2] == messages[2]
+    assert track[-1] == messages[-1]
+    assert isinstance(track[1:], MidiTrack)
+    assert track.to_track() == MidiTrack(messages)
+
+    regular = mido.MidiFile(tracks=[MidiTrack(messages)])
+    packed = mido.MidiFile(tracks=[track])
+    assert list(packed) == list(regular)
@@ -23,6 +23,11 @@ def test_hashability():
     hash(FrozenUnknownMetaMessage(123, [1, 2, 3]))
 
 
+def test_hash_equal_messages():
+    assert hash(FrozenMessage('note_on', note=1)) \
+        == hash(freeze_message(Message('note_on', note=1)))
+
+
 def test_freeze_and_thaw():
     """Test that messages are hashable."""
     assert not is_frozen(thaw_message(freeze_message(Message('note_on'))))
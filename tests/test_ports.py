@@ -2,6 +2,8 @@
 #
 # SPDX-License-Identifier: MIT
 
+import asyncio
+
 import pytest
 
 from mido.messages import Message
@@ -45,6 +47,12 @@ class TestIOPort:
         port.send(message)
         port.send(message)
 
+    def test_asend_message(self, port):
+        message = Message('note_on')
+
+        asyncio.run(port.asend(message))
+        assert port.receive() == message
+
     def test_port_close(self, port):
         port.close()
         assert port.close_called